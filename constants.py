@@ -6,20 +6,43 @@ This file contains configuration values and constants used throughout the applic
 """
 
 import os
+import functools
+from types import MappingProxyType
 
 # Google Cloud and Vertex AI configuration
-PROJECT_ID = os.getenv("PROJECT_ID", "top-vial-429221-p6")
-LOCATION = os.getenv("LOCATION", "us-central1")
-API_ENDPOINT = os.getenv("API_ENDPOINT", "us-central1-aiplatform.googleapis.com")
-MODEL_NAME = os.getenv("MODEL_NAME", "gemini-1.5-flash-002")
+# Resolved from the environment on first use rather than at import time;
+# call <accessor>.cache_clear() after changing the environment.
+@functools.cache
+def project_id():
+    return os.getenv("PROJECT_ID", "top-vial-429221-p6")
+
+@functools.cache
+def location():
+    return os.getenv("LOCATION", "us-central1")
+
+@functools.cache
+def api_endpoint():
+    return os.getenv("API_ENDPOINT", "us-central1-aiplatform.googleapis.com")
+
+@functools.cache
+def model_name():
+    return os.getenv("MODEL_NAME", "gemini-1.5-flash-002")
+
+# Cheaper model for identifying relevant files and summarizing them
+@functools.cache
+def summary_model_name():
+    return os.getenv("SUMMARY_MODEL_NAME", "gemini-2.5-flash-lite")
 
 # Generation configuration for Gemini
-GENERATION_CONFIG = {
+GENERATION_CONFIG = MappingProxyType({
     "temperature": 0.2,
     "top_p": 0.8,
     "top_k": 40,
     "max_output_tokens": 8192,
-}
+})
+
+# Lifetime of the Vertex AI context cache holding the repository preamble
+CONTEXT_CACHE_TTL_SECONDS = 3600
 
 # Default paths
 DEFAULT_OUTPUT_DIR = "./terraform_analysis"
@@ -54,20 +77,21 @@ CUSTOM_CSS = """
 """
 
 # Required dependencies
-REQUIRED_DEPENDENCIES = {
+REQUIRED_DEPENDENCIES = MappingProxyType({
     "networkx": "networkx",
     "git": "GitPython",
     "hcl2": "python-hcl2",
     "vertexai": "google-cloud-aiplatform",
     "matplotlib": "matplotlib",
     "plotly": "plotly",
-}
+    "orjson": "orjson",
+})
 
 # Installation instructions
 INSTALL_INSTRUCTIONS = """
 Please install the required dependencies:
 ```
-pip install networkx GitPython python-hcl2 google-cloud-aiplatform streamlit matplotlib plotly
+pip install networkx GitPython python-hcl2 google-cloud-aiplatform streamlit matplotlib plotly orjson
 ```
 
 Or install from requirements.txt:
@@ -88,12 +112,12 @@ EXAMPLE_REPOS = """
 """
 
 # Visualization colors
-VIZ_COLORS = ["#4CAF50", "#2196F3", "#FFC107", "#F44336"]
+VIZ_COLORS = ("#4CAF50", "#2196F3", "#FFC107", "#F44336")
 
 # Update the PLOTLY_COLORBAR_CONFIG constant if it exists
-PLOTLY_COLORBAR_CONFIG = {
+PLOTLY_COLORBAR_CONFIG = MappingProxyType({
     "thickness": 15,
     "title": "Node Type",
     "xanchor": "left",
     # No titleside property
-} 
\ No newline at end of file
+})
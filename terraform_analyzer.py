@@ -7,18 +7,135 @@ building a dependency graph of Terraform files and modules.
 """
 
 import os
-import subprocess
-import glob
 import re
-import networkx as nx
 import json
-from pathlib import Path
-import hcl2  # For parsing Terraform HCL files
+import hashlib
+import logging
+import pickle
 import argparse
-from git import Repo  # Using GitPython for more robust git operations
+import multiprocessing
+import random
+import shutil
+import stat
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+# networkx, hcl2 and GitPython are slow to import, so they are imported
+# inside the methods that need them
+
+log = logging.getLogger(__name__)
+
+# Directories that never contain Terraform sources worth analyzing
+SKIP_DIRS = {'.git', '.terraform', 'node_modules'}
+
+# Sparse checkout (gitignore-style) of root-level files plus Terraform sources anywhere in the tree
+SPARSE_CHECKOUT_PATTERNS = ('/*', '!/*/', '*.tf', '*.tf.json')
+
+# Below this many files, process pool startup costs more than parsing serially
+PARALLEL_PARSE_MIN_FILES = 16
+
+# Scripts whose top level is guarded by `if __name__ == "__main__"`. Spawned workers
+# re-import the main module, so files are only parsed in processes when one of these
+# was launched (under e.g. `streamlit run` that would re-run the whole app per worker)
+_SPAWN_SAFE_MAIN_SCRIPTS = ('terraform_analyzer.py', 'terraform_modifier.py')
+
+# Concurrent Gemini requests when describing files
+DESCRIPTION_WORKERS = 16
+
+# Parsed HCL is cached here (inside cache_dir), keyed by path, mtime and size
+PARSE_CACHE_FILE = ".tf_parse_cache.json"
+
+# Gemini file descriptions are cached here (inside cache_dir), keyed by SHA-256 of the content
+DESCRIPTION_CACHE_FILE = ".gemini_desc_cache.json"
+
+# Graphs smaller than this are laid out with Kamada-Kawai, larger ones with a short spring layout
+LAYOUT_KAMADA_KAWAI_MAX_NODES = 200
+
+# GitHub web UI path segments (/tree/{branch}, /blob/{branch}) stripped from repository URLs
+_BRANCH_PATH_TAIL_RE = re.compile(r'/(?:tree|blob)/[^/]+/?$')
+_BRANCH_PATH_RE = re.compile(r'/(?:tree|blob)/[^/]+/')
+
+# Module blocks with a literal source ahead of any nested block or map, and module
+# block headers used to check the regex saw every block
+_MODULE_RE = re.compile(r'^[ \t]*module\s+"([^"]+)"\s*\{[^{}]*?\bsource\s*=\s*"([^"]+)"', re.MULTILINE)
+_MODULE_HEADER_RE = re.compile(r'^[ \t]*module\s+"[^"]+"\s*\{', re.MULTILINE)
+
+# Quoted strings (kept) and #, // and /* */ comments (removed) in HCL source
+_COMMENT_RE = re.compile(r'("(?:[^"\\\n]|\\.)*")|#[^\n]*|//[^\n]*|/\*.*?\*/', re.DOTALL)
+
+
+def _generate_with_retry(model, prompt, max_attempts=5):
+    """
+    Call model.generate_content, backing off exponentially on rate limiting.
+    
+    Args:
+        model: Vertex AI GenerativeModel instance
+        prompt (str): Prompt to send
+        max_attempts (int): Attempts before the last error is re-raised
+        
+    Returns:
+        The Gemini response
+    """
+    from google.api_core.exceptions import ResourceExhausted, ServiceUnavailable
+    
+    for attempt in range(max_attempts):
+        try:
+            return model.generate_content(prompt)
+        except (ResourceExhausted, ServiceUnavailable):
+            if attempt == max_attempts - 1:
+                raise
+            time.sleep(2 ** attempt + random.random())
+
+
+def _read_text(file_path):
+    """
+    Read a file as UTF-8 (which Terraform requires), skipping text-mode newline translation.
+    
+    Args:
+        file_path (str): Path to the file
+        
+    Returns:
+        str: Decoded file content, with undecodable bytes replaced
+    """
+    with open(file_path, 'rb') as file:
+        return file.read().decode('utf-8', errors='replace')
+
+
+def _parse_tf(file_path):
+    """
+    Parse a single Terraform file.
+    
+    Defined at module level so it can be pickled and run in worker processes.
+    
+    Args:
+        file_path (str): Path to the Terraform file
+        
+    Returns:
+        tuple: (file_path, parsed content dict, empty on failure)
+    """
+    try:
+        log.debug("Parsing file: %s", file_path)
+        if file_path.endswith('.tf.json'):
+            # JSON variant: the C json parser is far cheaper than the HCL grammar
+            with open(file_path, 'rb') as file:
+                return file_path, json.loads(file.read())
+        
+        if os.stat(file_path).st_size == 0:
+            return file_path, {}
+        
+        import hcl2  # For parsing Terraform HCL files
+        
+        # Parse HCL content
+        return file_path, hcl2.loads(_read_text(file_path))
+    except Exception as e:
+        log.warning("Error parsing %s: %s", file_path, e)
+        return file_path, {}
+
 
 class TerraformRepoAnalyzer:
-    def __init__(self, repo_url, branch="master", local_dir="./terraform_repo"):
+    def __init__(self, repo_url, branch="master", local_dir="./terraform_repo", cache_dir=None):
         """
         Initialize the analyzer with repository details.
         
@@ -26,12 +143,20 @@ class TerraformRepoAnalyzer:
             repo_url (str): GitHub repository URL
             branch (str): Branch to clone
             local_dir (str): Local directory to clone the repository into
+            cache_dir (str, optional): Directory for analysis caches (defaults to the parent of local_dir)
         """
+        import networkx as nx
+        
         # Clean the repository URL
         self.repo_url = self._clean_github_url(repo_url)
         self.branch = branch
         self.local_dir = local_dir
+        self.cache_dir = cache_dir or os.path.dirname(os.path.abspath(local_dir))
         self.dependency_graph = nx.DiGraph()
+        # Module directory -> .tf files in it, shared by every file referencing the module
+        self._module_files_cache = {}
+        # Path -> _stat_dir result, since the same module path is checked once per referencing file
+        self._stat_dir_cache = {}
         
     def _clean_github_url(self, url):
         """
@@ -43,13 +168,9 @@ class TerraformRepoAnalyzer:
         Returns:
             str: Clean URL suitable for git clone
         """
-        # Remove /tree/{branch} from GitHub URLs
-        url = re.sub(r'/tree/[^/]+/?$', '', url)
-        url = re.sub(r'/tree/[^/]+/', '/', url)
-        
-        # Remove /blob/{branch} from GitHub URLs
-        url = re.sub(r'/blob/[^/]+/?$', '', url)
-        url = re.sub(r'/blob/[^/]+/', '/', url)
+        # Remove /tree/{branch} and /blob/{branch} from GitHub URLs
+        url = _BRANCH_PATH_TAIL_RE.sub('', url)
+        url = _BRANCH_PATH_RE.sub('/', url)
         
         # Ensure the URL doesn't end with .git if it's a GitHub URL (GitHub adds this automatically)
         if 'github.com' in url and url.endswith('.git'):
@@ -60,6 +181,35 @@ class TerraformRepoAnalyzer:
         
         return url
     
+    def _clone(self):
+        """
+        Shallow, single-branch clone of the configured branch.
+        
+        A blobless partial clone with a sparse checkout of root-level files and
+        Terraform sources is tried first, so assets the analyzer never reads are
+        not downloaded. Falls back to a plain shallow clone if that fails.
+        """
+        from git import Repo, GitCommandError  # Using GitPython for more robust git operations
+        
+        shallow_options = [
+            "--depth=1",
+            "--single-branch",
+            f"--branch={self.branch}",
+            "--no-tags",
+        ]
+        try:
+            repo = Repo.clone_from(
+                self.repo_url,
+                self.local_dir,
+                multi_options=shallow_options + ["--filter=blob:none", "--no-checkout"],
+            )
+            repo.git.sparse_checkout("set", "--no-cone", *SPARSE_CHECKOUT_PATTERNS)
+            repo.git.checkout(self.branch)
+        except GitCommandError as e:
+            print(f"Partial clone failed, retrying with a full shallow clone: {e}")
+            shutil.rmtree(self.local_dir, ignore_errors=True)
+            Repo.clone_from(self.repo_url, self.local_dir, multi_options=shallow_options)
+    
     def clone_repository(self):
         """Clone the GitHub repository to the local directory."""
         try:
@@ -69,21 +219,25 @@ class TerraformRepoAnalyzer:
                 # Check if it's actually a git repository
                 if not os.path.exists(os.path.join(self.local_dir, '.git')):
                     print("Directory exists but is not a git repository. Removing and cloning again.")
-                    import shutil
                     shutil.rmtree(self.local_dir)
-                    Repo.clone_from(self.repo_url, self.local_dir, branch=self.branch)
+                    self._clone()
                     print("Repository cloned successfully.")
                 else:
                     # Update the repository instead of skipping
                     print("Updating existing repository...")
+                    from git import Repo
                     repo = Repo(self.local_dir)
                     origin = repo.remotes.origin
-                    origin.fetch()
-                    origin.pull()
+                    # Only the tip of the branch is analyzed, so fetch it shallowly
+                    # and move the working tree onto it instead of merging history.
+                    # The explicit refspec creates the remote-tracking ref, which a
+                    # --single-branch clone only has for the branch it was cloned with
+                    origin.fetch(refspec=f"+refs/heads/{self.branch}:refs/remotes/origin/{self.branch}", depth=1)
+                    repo.git.reset("--hard", f"origin/{self.branch}")
                     print("Repository updated successfully.")
             else:
                 print(f"Cloning repository {self.repo_url} to {self.local_dir}...")
-                Repo.clone_from(self.repo_url, self.local_dir, branch=self.branch)
+                self._clone()
                 print("Repository cloned successfully.")
                 
             # Verify that files were actually cloned
@@ -98,13 +252,11 @@ class TerraformRepoAnalyzer:
     
     def find_terraform_files(self):
         """Find all Terraform files in the repository."""
-        # Look for .tf files
-        tf_files = glob.glob(f"{self.local_dir}/**/*.tf", recursive=True)
-        
-        # Also look for .tf.json files
-        tf_json_files = glob.glob(f"{self.local_dir}/**/*.tf.json", recursive=True)
-        
-        all_files = tf_files + tf_json_files
+        # Collect .tf and .tf.json files in a single pass, pruning hidden and vendored directories
+        all_files = []
+        for root, dirs, files in os.walk(self.local_dir):
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS and not d.startswith('.')]
+            all_files.extend(os.path.join(root, f) for f in files if f.endswith(('.tf', '.tf.json')))
         
         # Print some debug information
         print(f"Repository directory: {self.local_dir}")
@@ -113,15 +265,15 @@ class TerraformRepoAnalyzer:
         print(f"Found {len(all_files)} Terraform files.")
         
         if len(all_files) == 0:
-            # Try listing all files to see what's there
-            all_repo_files = []
+            # Show a few files to see what's there, stopping as soon as we have enough
+            sample = []
             for root, dirs, files in os.walk(self.local_dir):
-                for file in files:
-                    all_repo_files.append(os.path.join(root, file))
+                sample.extend(os.path.join(root, file) for file in files)
+                if len(sample) >= 10:
+                    break
             
-            print(f"Total files in repository: {len(all_repo_files)}")
             print("Sample of files found:")
-            for file in all_repo_files[:10]:  # Show first 10 files
+            for file in sample[:10]:  # Show first 10 files
                 print(f"- {file}")
         
         return all_files
@@ -136,16 +288,84 @@ class TerraformRepoAnalyzer:
         Returns:
             dict: Parsed Terraform content
         """
+        return _parse_tf(file_path)[1]
+    
+    def parse_terraform_files(self, file_paths):
+        """
+        Parse several Terraform files, fanning out across CPU cores.
+        
+        HCL parsing is CPU-bound pure Python, so processes are used rather than threads.
+        When the analyzer runs inside another app (e.g. Streamlit), files are parsed
+        serially, since every worker would re-run the app's script.
+        
+        Args:
+            file_paths (list): Paths to the Terraform files
+            
+        Returns:
+            dict: Mapping of file path to parsed Terraform content
+        """
+        cache_path = os.path.join(self.cache_dir, PARSE_CACHE_FILE)
+        cache = self._load_parse_cache(cache_path)
+        
+        # Serve unchanged files from the cache, only parse the rest
+        results = {}
+        keys = {}
+        for file_path in file_paths:
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                results[file_path] = {}
+                continue
+            keys[file_path] = (st.st_mtime_ns, st.st_size)
+            entry = cache.get(file_path)
+            if entry is not None and tuple(entry[0]) == keys[file_path]:
+                results[file_path] = entry[1]
+        
+        misses = [file_path for file_path in keys if file_path not in results]
+        if not misses:
+            return results
+        
+        main_script = os.path.basename(getattr(sys.modules['__main__'], '__file__', None) or '')
+        if len(misses) < PARALLEL_PARSE_MIN_FILES or main_script not in _SPAWN_SAFE_MAIN_SCRIPTS:
+            parsed = dict(_parse_tf(file_path) for file_path in misses)
+        else:
+            # Spawn rather than fork: analyze_repository may have Gemini (gRPC) threads running
+            workers = min(os.cpu_count() or 1, len(misses))
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                parsed = dict(executor.map(_parse_tf, misses, chunksize=8))
+        
+        for file_path, parsed_content in parsed.items():
+            cache[file_path] = (keys[file_path], parsed_content)
+        results.update(parsed)
+        self._save_parse_cache(cache_path, cache)
+        
+        return results
+    
+    def _load_parse_cache(self, cache_path):
+        """Load the parse cache, returning an empty one if it is missing or unreadable."""
+        # JSON rather than pickle: the parsed HCL is plain dicts and lists, and loading
+        # a file from cache_dir must not be able to run code
         try:
-            with open(file_path, 'r') as file:
-                print(f"Parsing file: {file_path}")
-                # Parse HCL content
-                parsed_content = hcl2.load(file)
-                return parsed_content
+            with open(cache_path, 'rb') as f:
+                cache = json.loads(f.read())
+            return cache if isinstance(cache, dict) else {}
+        except FileNotFoundError:
+            return {}
         except Exception as e:
-            print(f"Error parsing {file_path}: {e}")
+            print(f"Ignoring unreadable parse cache {cache_path}: {e}")
             return {}
     
+    def _save_parse_cache(self, cache_path, cache):
+        """Write the parse cache atomically."""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = cache_path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(cache, f, separators=(',', ':'))
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            print(f"Error writing parse cache {cache_path}: {e}")
+    
     def extract_module_dependencies(self, file_path, parsed_content):
         """
         Extract module dependencies from a Terraform file.
@@ -155,43 +375,67 @@ class TerraformRepoAnalyzer:
             parsed_content (dict): Parsed Terraform content
             
         Returns:
-            list: List of module dependencies
+            tuple: Parallel lists (module names, module sources)
         """
-        dependencies = []
+        names = []
+        sources = []
         
         # Extract module sources
         if 'module' in parsed_content:
             module_content = parsed_content['module']
-            print(f"Found modules in {file_path}")
+            log.debug("Found modules in %s", file_path)
             
             # Handle both dictionary and list formats
             if isinstance(module_content, dict):
                 # Standard format: module is a dictionary
-                for module_name, module_config in module_content.items():
-                    if 'source' in module_config:
-                        source = module_config['source']
-                        print(f"  Module {module_name} source: {source}")
-                        dependencies.append({
-                            'type': 'module',
-                            'name': module_name,
-                            'source': source
-                        })
+                module_items = [module_content]
             elif isinstance(module_content, list):
                 # Alternative format: module is a list of dictionaries
-                for module_item in module_content:
-                    for module_name, module_config in module_item.items():
-                        if 'source' in module_config:
-                            source = module_config['source']
-                            print(f"  Module {module_name} source: {source}")
-                            dependencies.append({
-                                'type': 'module',
-                                'name': module_name,
-                                'source': source
-                            })
+                module_items = module_content
+            else:
+                module_items = []
+            
+            for module_item in module_items:
+                for module_name, module_config in module_item.items():
+                    if 'source' in module_config:
+                        source = module_config['source']
+                        log.debug("  Module %s source: %s", module_name, source)
+                        names.append(module_name)
+                        sources.append(source)
         else:
-            print(f"No modules found in {file_path}")
+            log.debug("No modules found in %s", file_path)
         
-        return dependencies
+        return names, sources
+    
+    def _extract_modules_fast(self, text):
+        """
+        Extract module dependencies from Terraform source text without a full HCL parse.
+        
+        Args:
+            text (str): Content of a .tf file
+            
+        Returns:
+            tuple or None: Parallel lists (module names, module sources), or None if
+            some module block couldn't be matched (e.g. nested blocks or a non-literal
+            source) and the file needs a full parse
+        """
+        if 'module' not in text:
+            return [], []
+        
+        # Heredocs aren't quoted, so comment markers inside them can't be told apart
+        if '<<' in text:
+            return None
+        
+        # Commented-out blocks aren't modules; keep line breaks so headers still start lines
+        text = _COMMENT_RE.sub(lambda m: m.group(1) or '\n' * m.group(0).count('\n'), text)
+        
+        matches = _MODULE_RE.findall(text)
+        if len(matches) != len(_MODULE_HEADER_RE.findall(text)):
+            return None
+        
+        names = [module_name for module_name, _ in matches]
+        sources = [source for _, source in matches]
+        return names, sources
     
     def resolve_module_path(self, source, parent_file):
         """
@@ -202,122 +446,249 @@ class TerraformRepoAnalyzer:
         # Handle local paths (including bare "../" or "./")
         if source.startswith('./') or source.startswith('../') or source in ['.', '..']:
             resolved_path = os.path.normpath(os.path.join(parent_dir, source))
-            print(f"Resolved module path: {source} -> {resolved_path}")
+            log.debug("Resolved module path: %s -> %s", source, resolved_path)
             return resolved_path
         
         # Handle relative paths without ./ or ../ prefix
         if not source.startswith('/') and not re.match(r'^[a-zA-Z]:', source) and '://' not in source:
             # Try to resolve as a local path first
             local_path = os.path.normpath(os.path.join(parent_dir, source))
-            if os.path.exists(local_path):
-                print(f"Resolved relative module path: {source} -> {local_path}")
+            if self._stat_dir(local_path) is not None:
+                log.debug("Resolved relative module path: %s -> %s", source, local_path)
                 return local_path
         
         # Handle other sources (GitHub, Terraform Registry, etc.)
-        print(f"Non-local module source: {source}")
+        log.debug("Non-local module source: %s", source)
         return source
     
-    def build_dependency_graph(self):
-        """Build a dependency graph of Terraform files."""
+    def _relative_path(self, path):
+        """
+        Make a path relative to the repository root.
+        
+        Everything found by the walk is anchored under local_dir, so slicing off the
+        prefix is enough; module paths are normalized and may only match the
+        normalized prefix.
+        
+        Args:
+            path (str): Path under local_dir
+            
+        Returns:
+            str: Path relative to local_dir
+        """
+        for prefix in (self.local_dir.rstrip(os.sep) + os.sep, os.path.normpath(self.local_dir) + os.sep):
+            if path.startswith(prefix):
+                return path[len(prefix):]
+        return os.path.relpath(path, self.local_dir)
+    
+    def build_dependency_graph(self, tf_files=None):
+        """
+        Build a dependency graph of Terraform files.
+        
+        Args:
+            tf_files (list, optional): Terraform files to use instead of searching the repository
+        """
         # Find all Terraform files
-        tf_files = self.find_terraform_files()
+        if tf_files is None:
+            tf_files = self.find_terraform_files()
+        self._module_files_cache.clear()
+        self._stat_dir_cache.clear()
+        
+        rel_map = {file_path: self._relative_path(file_path) for file_path in tf_files}
         
         # Add files as nodes
         for file_path in tf_files:
-            relative_path = os.path.relpath(file_path, self.local_dir)
+            relative_path = rel_map[file_path]
             self.dependency_graph.add_node(
                 relative_path, 
                 type='file',
                 path=file_path
             )
         
-        # Add dependencies as edges
-        edge_count = 0
+        # Extract module dependencies with the regex fast path where possible,
+        # collecting the files that need a full HCL parse
+        file_dependencies = {}
+        needs_parse = []
         for file_path in tf_files:
-            relative_path = os.path.relpath(file_path, self.local_dir)
-            parsed_content = self.parse_terraform_file(file_path)
+            dependencies = None
+            if file_path.endswith('.tf'):
+                try:
+                    dependencies = self._extract_modules_fast(_read_text(file_path))
+                except Exception as e:
+                    log.warning("Error reading %s: %s", file_path, e)
             
+            if dependencies is None:
+                needs_parse.append(file_path)
+            else:
+                file_dependencies[file_path] = dependencies
+        
+        # Parse the remaining files up front; graph mutation stays on this process
+        parsed_files = self.parse_terraform_files(needs_parse)
+        for file_path, parsed_content in parsed_files.items():
             if not parsed_content:
-                print(f"No parsed content for {file_path}")
+                log.debug("No parsed content for %s", file_path)
+                file_dependencies[file_path] = ([], [])
                 continue
-                
-            dependencies = self.extract_module_dependencies(file_path, parsed_content)
+            file_dependencies[file_path] = self.extract_module_dependencies(file_path, parsed_content)
+        
+        # Add dependencies as edges
+        edge_count = 0
+        for file_path in tf_files:
+            relative_path = rel_map[file_path]
+            names, sources = file_dependencies.get(file_path, ([], []))
             
-            if not dependencies:
-                print(f"No dependencies found in {file_path}")
+            if not names:
+                log.debug("No dependencies found in %s", file_path)
                 continue
                 
-            print(f"Found {len(dependencies)} dependencies in {file_path}")
+            log.debug("Found %d dependencies in %s", len(names), file_path)
             
-            for dep in dependencies:
-                if dep['type'] == 'module':
-                    module_path = self.resolve_module_path(dep['source'], file_path)
+            for module_name, source in zip(names, sources):
+                module_path = self.resolve_module_path(source, file_path)
+                
+                log.debug("Checking module path: %s", module_path)
+                
+                # Add module as node if it's a local path
+                is_dir = self._stat_dir(module_path)
+                if is_dir is None:
+                    log.debug("Module path does not exist: %s", module_path)
+                    continue
+                if not is_dir:
+                    log.debug("Module path exists but is not a directory: %s", module_path)
+                    continue
+                
+                # Look for main.tf or similar in the module directory
+                module_files = self._module_files(module_path)
+                
+                log.debug("Found module files for %s: %d files", source, len(module_files))
+                
+                if not module_files:
+                    log.warning("No .tf files found in module directory: %s", module_path)
+                    continue
                     
-                    print(f"Checking module path: {module_path}")
+                for module_file in module_files:
+                    module_relative_path = rel_map.get(module_file) or self._relative_path(module_file)
                     
-                    # Add module as node if it's a local path
-                    if os.path.exists(module_path):
-                        if os.path.isdir(module_path):
-                            # Look for main.tf or similar in the module directory
-                            module_files = glob.glob(f"{module_path}/*.tf")
-                            
-                            print(f"Found module files for {dep['source']}: {len(module_files)} files")
-                            
-                            if not module_files:
-                                print(f"Warning: No .tf files found in module directory: {module_path}")
-                                continue
-                                
-                            for module_file in module_files:
-                                module_relative_path = os.path.relpath(module_file, self.local_dir)
-                                
-                                print(f"Adding edge: {relative_path} -> {module_relative_path}")
-                                
-                                self.dependency_graph.add_edge(
-                                    relative_path, 
-                                    module_relative_path,
-                                    type='module_dependency',
-                                    module_name=dep['name']
-                                )
-                                edge_count += 1
-                        else:
-                            print(f"Module path exists but is not a directory: {module_path}")
-                    else:
-                        print(f"Module path does not exist: {module_path}")
+                    log.debug("Adding edge: %s -> %s", relative_path, module_relative_path)
+                    
+                    self.dependency_graph.add_edge(
+                        relative_path, 
+                        module_relative_path,
+                        type='module_dependency',
+                        module_name=module_name
+                    )
+                    edge_count += 1
         
         print(f"Built dependency graph with {self.dependency_graph.number_of_nodes()} nodes and {edge_count} edges.")
     
-    def export_graph(self, output_file="terraform_graph.json"):
+    def _stat_dir(self, path):
+        """
+        Check whether a path exists and is a directory with a single stat, memoized per path.
+        
+        Args:
+            path (str): Path to check
+            
+        Returns:
+            bool or None: True for a directory, False for another kind of file, None if it doesn't exist
+        """
+        if path in self._stat_dir_cache:
+            return self._stat_dir_cache[path]
+        
+        try:
+            is_dir = stat.S_ISDIR(os.stat(path).st_mode)
+        except (OSError, ValueError):
+            is_dir = None
+        self._stat_dir_cache[path] = is_dir
+        return is_dir
+    
+    def _module_files(self, module_path):
+        """
+        List the .tf files directly inside a module directory, memoized per directory.
+        
+        Args:
+            module_path (str): Path to the module directory
+            
+        Returns:
+            list: Paths of the module's .tf files
+        """
+        module_files = self._module_files_cache.get(module_path)
+        if module_files is None:
+            module_files = [
+                os.path.join(module_path, f) for f in os.listdir(module_path)
+                if f.endswith('.tf') and not f.startswith('.')
+            ]
+            self._module_files_cache[module_path] = module_files
+        return module_files
+    
+    def export_graph(self, output_file="terraform_graph.json", pickle_file=None):
         """
         Export the dependency graph to a JSON file.
         
         Args:
             output_file (str): Path to the output file
+            pickle_file (str, optional): Also pickle the graph here for fast reloading
         """
-        graph_data = {
-            "nodes": [],
-            "edges": []
-        }
-        
-        for node in self.dependency_graph.nodes():
-            node_data = self.dependency_graph.nodes[node]
-            graph_data["nodes"].append({
-                "id": node,
-                "type": node_data.get("type", "unknown"),
-                "path": node_data.get("path", "")
-            })
-        
-        for source, target, data in self.dependency_graph.edges(data=True):
-            graph_data["edges"].append({
-                "source": source,
-                "target": target,
-                "type": data.get("type", "unknown"),
-                "module_name": data.get("module_name", "")
-            })
-        
-        with open(output_file, 'w') as f:
-            json.dump(graph_data, f, indent=2)
+        from networkx.readwrite import json_graph
+        
+        # Keep the "edges" key used by earlier exports
+        try:
+            graph_data = json_graph.node_link_data(self.dependency_graph, edges="edges")
+        except TypeError:  # networkx < 3.4
+            graph_data = json_graph.node_link_data(self.dependency_graph, link="edges")
+        
+        try:
+            import orjson
+            with open(output_file, 'wb') as f:
+                f.write(orjson.dumps(graph_data))
+        except ImportError:
+            with open(output_file, 'w') as f:
+                json.dump(graph_data, f, separators=(',', ':'))
         
         print(f"Dependency graph exported to {output_file}")
+        
+        if pickle_file:
+            with open(pickle_file, 'wb') as f:
+                pickle.dump(self.dependency_graph, f, protocol=pickle.HIGHEST_PROTOCOL)
+            print(f"Dependency graph pickled to {pickle_file}")
+    
+    def _graph_layout(self, layout_file):
+        """
+        Compute node positions for visualization, reusing a cached layout for the same graph.
+        
+        Args:
+            layout_file (str): JSON file caching the last computed layout
+            
+        Returns:
+            dict: Mapping of node to (x, y) position
+        """
+        import networkx as nx
+        
+        graph = self.dependency_graph
+        fingerprint = hashlib.sha256(
+            json.dumps([sorted(graph.nodes()), sorted(graph.edges())]).encode('utf-8')
+        ).hexdigest()
+        
+        try:
+            with open(layout_file, 'r') as f:
+                cached = json.load(f)
+            if cached.get("key") == fingerprint:
+                return {node: tuple(xy) for node, xy in cached["pos"].items()}
+        except (OSError, ValueError, KeyError):
+            pass
+        
+        # Kamada-Kawai gives nicer small layouts; large graphs get a short, seeded spring layout
+        if graph.number_of_nodes() < LAYOUT_KAMADA_KAWAI_MAX_NODES:
+            pos = nx.kamada_kawai_layout(graph)
+        else:
+            pos = nx.spring_layout(graph, iterations=20, seed=0)
+        pos = {node: (float(x), float(y)) for node, (x, y) in pos.items()}
+        
+        try:
+            with open(layout_file, 'w') as f:
+                json.dump({"key": fingerprint, "pos": pos}, f, separators=(',', ':'))
+        except OSError as e:
+            log.warning("Error writing layout cache %s: %s", layout_file, e)
+        
+        return pos
     
     def visualize_graph(self, output_file="terraform_graph.png"):
         """
@@ -328,9 +699,10 @@ class TerraformRepoAnalyzer:
         """
         try:
             import matplotlib.pyplot as plt
+            import networkx as nx
             
             plt.figure(figsize=(12, 10))
-            pos = nx.spring_layout(self.dependency_graph)
+            pos = self._graph_layout(os.path.join(os.path.dirname(os.path.abspath(output_file)), "layout.json"))
             
             # Draw nodes
             nx.draw_networkx_nodes(self.dependency_graph, pos, node_size=500, alpha=0.8)
@@ -350,70 +722,172 @@ class TerraformRepoAnalyzer:
             print("Matplotlib is required for visualization. Install it with 'pip install matplotlib'.")
     
     def analyze_repository(self):
-        """Analyze the repository and build the dependency graph."""
+        """
+        Analyze the repository and build the dependency graph.
+        
+        Returns:
+            nx.DiGraph: The dependency graph
+        """
         self.clone_repository()
-        self.build_dependency_graph()
+        tf_files = self.find_terraform_files()
+        
+        # Descriptions only need the file list, so request them from Gemini in
+        # the background while the dependency graph is built
+        nodes = [self._relative_path(file_path) for file_path in tf_files]
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            descriptions = executor.submit(self._describe_nodes, nodes)
+            self.build_dependency_graph(tf_files)
+            for node, description in descriptions.result().items():
+                self.dependency_graph.nodes[node]['description'] = description
+        
+        # Cover any nodes added while resolving modules
         self.generate_file_descriptions()
+        return self.dependency_graph
         
     def generate_file_descriptions(self):
         """Generate descriptions for each file using Gemini."""
+        # Skip nodes that already have a description
+        pending = [
+            node for node in self.dependency_graph.nodes()
+            if not self.dependency_graph.nodes[node].get('description')
+        ]
+        if not pending:
+            return
+        
+        for node, description in self._describe_nodes(pending).items():
+            self.dependency_graph.nodes[node]['description'] = description
+    
+    def _describe_nodes(self, nodes):
+        """
+        Describe files with Gemini without touching the graph, so it can run alongside graph construction.
+        
+        Args:
+            nodes (list): Graph nodes (paths relative to the repository root)
+            
+        Returns:
+            dict: Mapping of node to description, with a default for files that couldn't be described
+        """
+        descriptions = {}
+        
+        # Reuse descriptions of byte-identical content from earlier runs
+        cache_path = os.path.join(self.cache_dir, DESCRIPTION_CACHE_FILE)
+        cache = self._load_description_cache(cache_path)
+        # Identical bodies (e.g. main.tf copied across environments) share one request
+        groups = defaultdict(list)
+        contents = {}
+        for node in nodes:
+            try:
+                with open(os.path.join(self.local_dir, node), 'rb') as f:
+                    data = f.read()
+            except Exception as e:
+                print(f"Error reading {node}: {e}")
+                descriptions[node] = "Terraform configuration file"
+                continue
+            
+            digest = hashlib.sha256(data).hexdigest()
+            if digest in cache:
+                descriptions[node] = cache[digest]
+            elif digest not in groups:
+                groups[digest].append(node)
+                contents[digest] = data.decode('utf-8', errors='replace')
+            else:
+                groups[digest].append(node)
+        
+        print(f"Reused {len(nodes) - sum(map(len, groups.values()))} cached file descriptions.")
+        if not groups:
+            return descriptions
+        
         try:
             # Import Vertex AI
             import vertexai
             from vertexai.generative_models import GenerativeModel
-            from constants import PROJECT_ID, LOCATION, MODEL_NAME
+            from constants import project_id, location, model_name
             
             # Initialize Vertex AI
-            vertexai.init(project=PROJECT_ID, location=LOCATION)
-            model = GenerativeModel(MODEL_NAME)
+            vertexai.init(project=project_id(), location=location())
+            model = GenerativeModel(model_name())
             
             print("Generating file descriptions...")
             
-            # Add descriptions to each node in the graph
-            for node in self.dependency_graph.nodes():
-                # Skip if description already exists
-                if self.dependency_graph.nodes[node].get('description'):
-                    continue
-                    
-                # Read file content
-                file_path = os.path.join(self.local_dir, node)
-                try:
-                    with open(file_path, 'r') as f:
-                        content = f.read()
-                        
-                    # Truncate content if it's too long
-                    if len(content) > 10000:
-                        content = content[:10000] + "... (truncated)"
-                    
-                    # Generate description using Gemini
-                    prompt = f"""
-                    You are a Terraform expert. Please provide a brief description (2-3 sentences) of what this Terraform file does:
-                    
-                    ```
-                    {content}
-                    ```
-                    
-                    Your description should be concise and focus on the main resources, modules, or configurations in the file.
-                    """
-                    
-                    response = model.generate_content(prompt)
-                    description = response.text.strip()
-                    
-                    # Add description to the node
-                    self.dependency_graph.nodes[node]['description'] = description
-                    print(f"Generated description for {node}")
-                    
-                except Exception as e:
-                    print(f"Error generating description for {node}: {e}")
-                    # Add a default description
-                    self.dependency_graph.nodes[node]['description'] = "Terraform configuration file"
+            # Requests are network-bound, so issue them concurrently
+            with ThreadPoolExecutor(max_workers=DESCRIPTION_WORKERS) as executor:
+                futures = {
+                    executor.submit(self._describe_file, model, contents[digest]): digest
+                    for digest in groups
+                }
+                for future in as_completed(futures):
+                    digest = futures[future]
+                    try:
+                        description = future.result()
+                        cache[digest] = description
+                        log.debug("Generated description for %s", groups[digest])
+                    except Exception as e:
+                        print(f"Error generating description for {', '.join(groups[digest])}: {e}")
+                        # Add a default description
+                        description = "Terraform configuration file"
+                    for node in groups[digest]:
+                        descriptions[node] = description
+            
+            self._save_description_cache(cache_path, cache)
         
         except Exception as e:
             print(f"Error initializing Gemini for file descriptions: {e}")
-            # Add default descriptions if Gemini fails
-            for node in self.dependency_graph.nodes():
-                if not self.dependency_graph.nodes[node].get('description'):
-                    self.dependency_graph.nodes[node]['description'] = "Terraform configuration file"
+        
+        # Add default descriptions for anything Gemini didn't cover
+        for node in nodes:
+            descriptions.setdefault(node, "Terraform configuration file")
+        return descriptions
+    
+    def _describe_file(self, model, content):
+        """
+        Ask Gemini for a short description of a single file.
+        
+        Args:
+            model: Vertex AI GenerativeModel instance
+            content (str): Content of the file
+            
+        Returns:
+            str: Description of the file
+        """
+        # Truncate content if it's too long
+        if len(content) > 10000:
+            content = content[:10000] + "... (truncated)"
+        
+        # Generate description using Gemini
+        prompt = f"""
+        You are a Terraform expert. Please provide a brief description (2-3 sentences) of what this Terraform file does:
+        
+        ```
+        {content}
+        ```
+        
+        Your description should be concise and focus on the main resources, modules, or configurations in the file.
+        """
+        
+        response = _generate_with_retry(model, prompt)
+        return response.text.strip()
+    
+    def _load_description_cache(self, cache_path):
+        """Load the description cache, returning an empty one if it is missing or unreadable."""
+        try:
+            with open(cache_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Ignoring unreadable description cache {cache_path}: {e}")
+            return {}
+    
+    def _save_description_cache(self, cache_path, cache):
+        """Write the description cache atomically."""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = cache_path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(cache, f)
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            print(f"Error writing description cache {cache_path}: {e}")
 
 
 def main():
@@ -423,9 +897,13 @@ def main():
     parser.add_argument("--branch", default="master", help="Branch to clone (default: master)")
     parser.add_argument("--output-dir", default="./terraform_analysis", help="Directory to store analysis results")
     parser.add_argument("--visualize", action="store_true", help="Generate a visualization of the dependency graph")
+    parser.add_argument("--pickle", action="store_true", help="Also save the dependency graph as a pickle for fast reloading")
+    parser.add_argument("--verbose", action="store_true", help="Log per-file parsing and dependency details")
     
     args = parser.parse_args()
     
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING, format="%(message)s")
+    
     # Create output directory if it doesn't exist
     os.makedirs(args.output_dir, exist_ok=True)
     
@@ -433,11 +911,12 @@ def main():
     local_dir = os.path.join(args.output_dir, "repo")
     graph_file = os.path.join(args.output_dir, "terraform_graph.json")
     viz_file = os.path.join(args.output_dir, "terraform_graph.png")
+    pickle_file = os.path.join(args.output_dir, "terraform_graph.gpickle") if args.pickle else None
     
     # Run analysis
-    analyzer = TerraformRepoAnalyzer(args.repo_url, args.branch, local_dir)
+    analyzer = TerraformRepoAnalyzer(args.repo_url, args.branch, local_dir, cache_dir=args.output_dir)
     graph = analyzer.analyze_repository()
-    analyzer.export_graph(graph_file)
+    analyzer.export_graph(graph_file, pickle_file=pickle_file)
     
     if args.visualize:
         analyzer.visualize_graph(viz_file)
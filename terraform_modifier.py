@@ -9,49 +9,765 @@ to generate the necessary code changes.
 
 import os
 import re
+import atexit
 import json
+import hashlib
+import logging
+import mmap
+import asyncio
 import argparse
+import datetime
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from terraform_analyzer import TerraformRepoAnalyzer
 
+log = logging.getLogger(__name__)
+
+# Vertex AI SDK (checked when a TerraformCodeModifier is created)
+try:
+    import vertexai
+    from vertexai.generative_models import GenerativeModel
+    _HAS_VERTEX = True
+except ImportError:
+    _HAS_VERTEX = False
+
+# (project, location) pairs vertexai.init has already been called for in this process
+_INITED = set()
+
 # Import constants
 from constants import (
-    PROJECT_ID, LOCATION, API_ENDPOINT, MODEL_NAME, 
-    GENERATION_CONFIG, DEFAULT_OUTPUT_DIR, DEFAULT_BRANCH
+    project_id, location, api_endpoint, model_name as default_model_name,
+    summary_model_name as default_summary_model_name,
+    GENERATION_CONFIG, DEFAULT_OUTPUT_DIR, DEFAULT_BRANCH, CONTEXT_CACHE_TTL_SECONDS
+)
+
+# Gemini responses are cached here (inside the analyzer's cache_dir), keyed by SHA-256 of model and prompt
+PROMPT_CACHE_DIR = os.path.join(".cache", "prompts")
+
+# File summaries are cached here (inside the analyzer's cache_dir), keyed by SHA-256 of the summary model and content
+SUMMARY_CACHE_FILE = ".summary_cache.json"
+
+# Description used for files the analyzer couldn't describe
+DEFAULT_DESCRIPTION = "Terraform configuration file"
+
+# Maximum number of concurrent per-file modification requests
+MODIFY_CONCURRENCY = 8
+
+# Threads used to prefetch file contents for modify_files
+READ_WORKERS = 8
+
+# System instruction stored with the cached repository context
+SYSTEM_INSTRUCTION = "You are a Terraform expert helping to modify the Terraform repository described in the context."
+
+# Files larger than this are cut down to whole top-level blocks before being sent to Gemini
+MAX_PROMPT_BYTES = 32768
+
+# Start of a top-level HCL block (resource "x" "y" {, module "m" {, locals {, ...)
+_BLOCK_HEADER_RE = re.compile(
+    rb'^(?:resource|data|module|variable|output|locals|provider|terraform)\b[^\n]*', re.MULTILINE
+)
+
+# Largest graph-prefiltered candidate set sent to Gemini instead of the whole repository
+MAX_CANDIDATE_FILES = 50
+
+# Repositories with at most this many bytes of Terraform are modified with a single Gemini request
+FUSED_MAX_BYTES = 65536
+
+# Words in a request too common in Terraform repositories to pick out files
+_WORD_RE = re.compile(r'[a-z0-9]+')
+_STOPWORDS = frozenset("""
+a an and are as at be by for from in into is it of on or that the this to with
+add change create make modify new remove update use set all each file files
+terraform tf json main configuration config module modules resource resources variable variables
+""".split())
+
+# Repositories with at most this many files skip the Gemini identify step
+SMALL_REPO_FILES = 20
+
+# Files containing an identifier named in a request seed Gemini's candidate set,
+# when there are at most this many of them
+OBVIOUS_MAX_FILES = 5
+
+# Terraform identifiers in a request: references (var.region, module.vpc.id, ...) and
+# names with an underscore (multi_az, aws_s3_bucket.logs, ...); plain hyphenated or
+# dotted words like read-only, us-east-1 or t3.micro aren't identifiers
+_IDENTIFIER_RE = re.compile(
+    r'(?<![\w.-])(?:(?:var|local|module|data)\.[\w-]+(?:\.[\w-]+)*|[A-Za-z][\w-]*_[\w-]*(?:\.[\w-]+)*)'
 )
 
+# Patterns for pulling file lists and code out of Gemini responses
+_TF_PATH_RE = re.compile(r'"([^"]+\.tf)"')
+_CODE_BLOCK_RE = re.compile(r'```(?:terraform|hcl)?\s*([\s\S]*?)\s*```')
+
+
+def _trim_to_blocks(buf, max_bytes):
+    """
+    Cut Terraform source down to whole top-level blocks that fit in max_bytes.
+    
+    Args:
+        buf (bytes or mmap.mmap): File content
+        max_bytes (int): Size budget
+        
+    Returns:
+        str: The kept blocks, with a note about what was omitted
+    """
+    starts = [m.start() for m in _BLOCK_HEADER_RE.finditer(buf)]
+    if not starts:
+        return bytes(buf[:max_bytes]).decode('utf-8', errors='replace') + "\n... (truncated)"
+    
+    # Anything before the first block (comments) counts as part of it
+    starts[0] = 0
+    spans = list(zip(starts, starts[1:] + [len(buf)]))
+    
+    kept = []
+    used = 0
+    for start, end in spans:
+        if used + (end - start) > max_bytes:
+            continue
+        kept.append(bytes(buf[start:end]).decode('utf-8', errors='replace'))
+        used += end - start
+    
+    text = "".join(kept)
+    omitted = len(spans) - len(kept)
+    if omitted:
+        text += f"\n# ... ({omitted} other blocks omitted)\n"
+    return text
+
+
+def _read_for_prompt(path, max_bytes=MAX_PROMPT_BYTES):
+    """
+    Read a Terraform file for inclusion in a prompt, capping its size.
+    
+    The file is memory-mapped so oversize files are cut down to whole blocks
+    without decoding all of their content.
+    
+    Args:
+        path (str): Path to the file
+        max_bytes (int, optional): Size budget, or None for the whole file
+        
+    Returns:
+        str: File content for the prompt
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if max_bytes is None or size <= max_bytes:
+                return mm[:].decode('utf-8', errors='replace')
+            return _trim_to_blocks(mm, max_bytes)
+
+
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _find_json(text, opener, accept):
+    """
+    Decode the first suitable JSON value embedded in a response.
+    
+    Each occurrence of opener is tried in turn with JSONDecoder.raw_decode, which
+    stops at the end of the value instead of matching up to the last bracket.
+    
+    Args:
+        text (str): Response text
+        opener (str): '[' or '{'
+        accept (callable): Predicate the decoded value must satisfy
+        
+    Returns:
+        The value, or None if the text has no suitable value
+    """
+    index = text.find(opener)
+    while index >= 0:
+        try:
+            value, _ = _JSON_DECODER.raw_decode(text, index)
+            if accept(value):
+                return value
+        except ValueError:
+            pass
+        index = text.find(opener, index + 1)
+    return None
+
+
+def _find_json_array(text):
+    """Decode the first JSON array of strings embedded in a response."""
+    return _find_json(
+        text, '[', lambda value: isinstance(value, list) and all(isinstance(item, str) for item in value)
+    )
+
+
+def _find_json_files(text):
+    """Decode the first {"files": [{"path": ..., "new_content": ...}]} object embedded in a response."""
+    def accept(value):
+        return (
+            isinstance(value, dict)
+            and isinstance(value.get('files'), list)
+            and all(
+                isinstance(item, dict)
+                and isinstance(item.get('path'), str)
+                and isinstance(item.get('new_content'), str)
+                for item in value['files']
+            )
+        )
+    return _find_json(text, '{', accept)
+
+
+def _grep_files(pattern, local_dir, file_paths):
+    """
+    Find the files whose content matches a pattern.
+    
+    Args:
+        pattern (re.Pattern): Pattern to search for
+        local_dir (str): Repository root
+        file_paths (list): Relative paths of the files to search
+        
+    Returns:
+        list: Relative paths of the matching files
+    """
+    hits = []
+    for file_path in file_paths:
+        try:
+            if pattern.search(_read_for_prompt(os.path.join(local_dir, file_path), max_bytes=None)):
+                hits.append(file_path)
+        except OSError as e:
+            log.warning("Error reading file %s: %s", file_path, e)
+    return hits
+
+
+def _whole_identifiers(names):
+    """Regex matching any of the names as a whole Terraform identifier (so vpc doesn't match vpc_id)."""
+    return r'(?<![\w-])(?:' + '|'.join(map(re.escape, names)) + r')(?![\w-])'
+
+
+def _shortcut_relevant_files(request, local_dir, file_paths):
+    """
+    Pick the files to modify without asking Gemini, in small repositories.
+    
+    The files mentioning a word from the request are used (or every file, if none does).
+    
+    Args:
+        request (str): Natural language description of the requested change
+        local_dir (str): Repository root
+        file_paths (list): Relative paths of every Terraform file
+        
+    Returns:
+        list: Files to modify, or an empty list if Gemini should decide
+    """
+    if len(file_paths) <= SMALL_REPO_FILES:
+        words = sorted(set(_WORD_RE.findall(request.lower())) - _STOPWORDS)
+        if words:
+            pattern = re.compile(_whole_identifiers(words), re.IGNORECASE)
+            return _grep_files(pattern, local_dir, file_paths) or list(file_paths)
+        return list(file_paths)
+    return []
+
+
+def _identifier_hits(request, local_dir, file_paths):
+    """
+    Find the few files containing the Terraform identifiers a request names.
+    
+    Args:
+        request (str): Natural language description of the requested change
+        local_dir (str): Repository root
+        file_paths (list): Relative paths of every Terraform file
+        
+    Returns:
+        list: Matching files, or an empty list if there are none or too many
+    """
+    identifiers = sorted(set(_IDENTIFIER_RE.findall(request)))
+    if identifiers:
+        pattern = re.compile(_whole_identifiers(identifiers))
+        hits = _grep_files(pattern, local_dir, file_paths)
+        if len(hits) <= OBVIOUS_MAX_FILES:
+            return hits
+    return []
+
+
+def _collect_stream(stream, stop=None):
+    """
+    Join the text of a streamed Gemini response.
+    
+    Args:
+        stream: Iterable of response chunks
+        stop (callable, optional): Predicate on the text so far; when it returns True
+            the stream is closed and the rest of the response isn't generated
+            
+    Returns:
+        str: The response text
+    """
+    text = ""
+    for chunk in stream:
+        text += chunk.text
+        if stop is not None and stop(text):
+            close = getattr(stream, 'close', None)
+            if close is not None:
+                close()
+            break
+    return text
+
+
+async def _collect_stream_async(stream, stop=None):
+    """Async variant of _collect_stream."""
+    text = ""
+    async for chunk in stream:
+        text += chunk.text
+        if stop is not None and stop(text):
+            aclose = getattr(stream, 'aclose', None)
+            if aclose is not None:
+                await aclose()
+            break
+    return text
+
+
+def _code_block_closed(text):
+    """Whether a response already holds a complete ``` code block."""
+    return text.count("```") >= 2
+
+
+def _file_has_content(path, data):
+    """
+    Check whether a file already holds exactly the given bytes.
+    
+    Args:
+        path (str): Path to the file
+        data (bytes): Expected content
+        
+    Returns:
+        bool: True if the file exists with that content
+    """
+    try:
+        # A size mismatch settles it without reading the file
+        if os.stat(path).st_size != len(data):
+            return False
+        with open(path, 'rb') as f:
+            return f.read() == data
+    except OSError:
+        return False
+
+
+class PromptDiskCache:
+    """Content-addressed disk cache of Gemini response texts, one file per prompt."""
+    
+    def __init__(self, directory):
+        """
+        Initialize the cache.
+        
+        Args:
+            directory (str): Directory holding the cached responses
+        """
+        self.directory = directory
+        self._created = False
+    
+    def _path(self, prompt):
+        """Cache file for a prompt."""
+        return os.path.join(self.directory, hashlib.sha256(prompt.encode('utf-8')).hexdigest())
+    
+    def get(self, prompt):
+        """
+        Get the cached response for a prompt.
+        
+        Args:
+            prompt (str): The prompt
+            
+        Returns:
+            str or None: The cached response text, if any
+        """
+        try:
+            with open(self._path(prompt), 'rb') as f:
+                return f.read().decode('utf-8')
+        except OSError:
+            return None
+    
+    def put(self, prompt, text):
+        """
+        Cache the response for a prompt, writing it atomically.
+        
+        Args:
+            prompt (str): The prompt
+            text (str): The response text
+        """
+        try:
+            if not self._created:
+                os.makedirs(self.directory, exist_ok=True)
+                self._created = True
+            path = self._path(prompt)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(text.encode('utf-8'))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            log.warning("Error writing prompt cache: %s", e)
+
+
 class TerraformCodeModifier:
-    def __init__(self, analyzer, credentials_path=None, model_name=MODEL_NAME):
+    def __init__(self, analyzer, credentials_path=None, model_name=None, use_cache=True,
+                 summary_model_name=None):
         """
         Initialize the code modifier.
         
         Args:
             analyzer (TerraformRepoAnalyzer): An initialized TerraformRepoAnalyzer instance
             credentials_path (str, optional): Path to Google Cloud credentials JSON file
-            model_name (str, optional): Name of the Gemini model to use
+            model_name (str, optional): Name of the Gemini model to use (defaults to MODEL_NAME from the environment)
+            use_cache (bool, optional): Reuse Gemini responses for identical prompts from the
+                analyzer's cache directory
+            summary_model_name (str, optional): Cheaper Gemini model for identifying files and
+                summarizing them (defaults to SUMMARY_MODEL_NAME from the environment)
         """
         self.analyzer = analyzer
+        self.prompt_cache = PromptDiskCache(os.path.join(analyzer.cache_dir, PROMPT_CACHE_DIR)) if use_cache else None
+        
+        # File summaries keyed by SHA-256 of the content, loaded on first use
+        self._summary_cache_path = os.path.join(os.path.abspath(analyzer.cache_dir), SUMMARY_CACHE_FILE)
+        self._summary_cache = None
+        self._summary_cache_dirty = False
         
         # Set credentials path if provided
         if credentials_path:
             os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
         
-        # Import Vertex AI
-        try:
-            import vertexai
-            from vertexai.generative_models import GenerativeModel
-            self.vertexai = vertexai
-            self.GenerativeModel = GenerativeModel
-        except ImportError:
+        # Vertex AI is imported once, with the module
+        if not _HAS_VERTEX:
             raise ImportError("Vertex AI SDK is required. Install with 'pip install google-cloud-aiplatform'")
+        self.vertexai = vertexai
+        self.GenerativeModel = GenerativeModel
         
         # Initialize Vertex AI
-        self.project_id = PROJECT_ID
-        self.location = LOCATION
-        self.model_name = model_name
+        self.project_id = project_id()
+        self.location = location()
+        self.model_name = model_name or default_model_name()
+        self.summary_model_name = summary_model_name or default_summary_model_name()
         self.generation_config = GENERATION_CONFIG
         
-        self.vertexai.init(project=self.project_id, location=self.location)
+        # vertexai.init sets up clients and credentials, so only do it once per project/location
+        key = (self.project_id, self.location)
+        if key not in _INITED:
+            self.vertexai.init(project=self.project_id, location=self.location)
+            _INITED.add(key)
+        
+        # Reuse one model (and its client) across all requests
+        self.model = self.GenerativeModel(self.model_name)
+        self.summary_model = self.GenerativeModel(self.summary_model_name)
+        
+        # Vertex AI context cache holding the repository preamble, created the second time
+        # the same preamble is needed and rebuilt when the graph changes (keyed on _file_info_key)
+        self._cached_context_key = None
+        self._context_requested_key = None
+        self._cached_content = None
+        self._cached_model = None
+        
+        # Per-file description/dependency map and prompt text derived from the graph
+        self._file_info_cache = None
+        self._file_info_key = None
+        self._graph_text_cache = {}
+        self._basename_index = None
+        self._node_words = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def close(self):
+        """Delete the Vertex AI context cache, if one was created."""
+        if self._cached_content is not None:
+            try:
+                self._cached_content.delete()
+            except Exception as e:
+                log.warning("Error deleting context cache: %s", e)
+            self._cached_content = None
+            self._cached_model = None
+        self._cached_context_key = None
+    
+    def _get_file_info_map(self):
+        """
+        Get each file's description and formatted dependencies.
+        
+        Built with a single pass over the graph's nodes and edges, and rebuilt
+        only when the graph changes.
+        
+        Returns:
+            dict: Mapping of file path to {"description": str, "deps": list}
+        """
+        graph = self.analyzer.dependency_graph
+        key = (id(graph), graph.number_of_nodes(), graph.number_of_edges())
+        
+        if self._file_info_cache is None or self._file_info_key != key:
+            info = {
+                node: {"description": data.get('description', DEFAULT_DESCRIPTION), "deps": []}
+                for node, data in graph.nodes(data=True)
+            }
+            for source, target, data in graph.edges(data=True):
+                dep_type = data.get('type', 'unknown')
+                module_name = data.get('module_name', '')
+                info[source]["deps"].append(f"{target} ({dep_type}{': ' + module_name if module_name else ''})")
+            
+            self._file_info_cache = info
+            self._file_info_key = key
+            self._graph_text_cache = {}
+            self._basename_index = None
+            self._node_words = None
+        
+        return self._file_info_cache
+    
+    def _find_by_basename(self, file_path):
+        """
+        Find a repository file with the same file name as a (possibly wrong) path.
+        
+        Args:
+            file_path (str): Path whose file name to look up
+            
+        Returns:
+            str or None: Relative path of the first matching file
+        """
+        file_info = self._get_file_info_map()
+        if self._basename_index is None:
+            # Every Terraform file is already a graph node, so no directory walk is needed
+            index = {}
+            for node in file_info:
+                index.setdefault(os.path.basename(node), []).append(node)
+            self._basename_index = index
+        
+        hits = self._basename_index.get(os.path.basename(file_path))
+        return hits[0] if hits else None
+    
+    def _repository_context(self, nodes=None):
+        """
+        Describe files in the repository with their descriptions and dependencies.
+        
+        Args:
+            nodes (list, optional): Files to describe (defaults to every file)
+            
+        Returns:
+            str: Repository listing used as the static part of prompts
+        """
+        file_info = self._get_file_info_map()
+        if nodes is None:
+            context = self._graph_text_cache.get('context')
+            if context is not None:
+                return context
+        
+        context = "Here are the files in the repository, with descriptions and dependencies:\n"
+        context += self._describe_files(file_info if nodes is None else nodes)
+        
+        if nodes is None:
+            self._graph_text_cache['context'] = context
+        return context
+    
+    def _describe_files(self, nodes):
+        """Format the FILE/DESCRIPTION/DEPENDENCIES listing for some files."""
+        file_info = self._get_file_info_map()
+        text = ""
+        for node in nodes:
+            info = file_info[node]
+            text += f"\nFILE: {node}\n"
+            text += f"DESCRIPTION: {info['description']}\n"
+            if info['deps']:
+                text += f"DEPENDENCIES: {', '.join(info['deps'])}\n"
+        return text
+    
+    def _neighbourhood(self, seeds, radius):
+        """
+        Expand files breadth-first over in- and out-edges of the dependency graph.
+        
+        Args:
+            seeds (list): Files to start from
+            radius (int): Number of hops to expand by
+            
+        Returns:
+            list: The seeds followed by the files reached, nearest first
+        """
+        graph = self.analyzer.dependency_graph
+        reached = dict.fromkeys(seeds)
+        frontier = list(reached)
+        for _ in range(radius):
+            next_frontier = []
+            for node in frontier:
+                for neighbour in itertools.chain(graph.successors(node), graph.predecessors(node)):
+                    if neighbour not in reached:
+                        reached[neighbour] = None
+                        next_frontier.append(neighbour)
+            frontier = next_frontier
+        
+        return list(reached)
+    
+    def _context_for(self, file_path, radius=2):
+        """
+        Describe a file's dependencies and the files around it in the dependency graph.
+        
+        Args:
+            file_path (str): File being modified
+            radius (int, optional): Number of dependency hops (in either direction) to include
+            
+        Returns:
+            str: Prompt text for the file's graph neighbourhood
+        """
+        info = self._get_file_info_map().get(file_path)
+        if info is None:
+            return ""
+        
+        context = f"DEPENDENCIES: {', '.join(info['deps'])}\n" if info['deps'] else ""
+        related = self._neighbourhood([file_path], radius)[1:]
+        if related:
+            context += f"\nRelated files (within {radius} dependency hops):\n"
+            context += self._describe_files(related)
+        return context
+    
+    def _seed_candidates(self, modification_request, radius=2):
+        """
+        Find files likely to be relevant to a request without asking Gemini.
+        
+        Files containing a Terraform identifier the request names, and files whose
+        path, description or dependencies share a word with the request, are the
+        seeds; their neighbours (in either direction) up to radius hops away are added.
+        
+        Args:
+            modification_request (str): Natural language description of the requested change
+            radius (int, optional): Number of hops to expand the seeds by
+            
+        Returns:
+            list: Candidate file paths (empty if no file matched)
+        """
+        file_info = self._get_file_info_map()
+        seeds = _identifier_hits(modification_request, self.analyzer.local_dir, list(file_info))
+        
+        words = set(_WORD_RE.findall(modification_request.lower())) - _STOPWORDS
+        if not words:
+            return self._neighbourhood(seeds, radius)
+        
+        if self._node_words is None:
+            self._node_words = {
+                node: set(_WORD_RE.findall(f"{node} {info['description']} {' '.join(info['deps'])}".lower()))
+                for node, info in file_info.items()
+            }
+        seeds += [node for node, node_words in self._node_words.items() if words & node_words and node not in seeds]
+        
+        return self._neighbourhood(seeds, radius)
+    
+    def _get_cached_model(self):
+        """
+        Get a model backed by a Vertex AI context cache of the repository preamble.
+        
+        Creating a cache costs a round trip and storage on top of the tokens, so it is
+        only created once the preamble for the same graph is requested a second time
+        (e.g. by a long-lived Streamlit modifier), and replaced (deleting the old one)
+        when the dependency graph changes. Returns None before then, and when caching
+        isn't available (e.g. the preamble is below the model's minimum cacheable size).
+        
+        Returns:
+            GenerativeModel or None: Model using the cached context
+        """
+        self._get_file_info_map()
+        if self._cached_context_key == self._file_info_key:
+            return self._cached_model
+        
+        # The repository changed: drop the stale cache
+        self.close()
+        
+        # A one-off request (e.g. a CLI run) sends the plain prompt
+        if self._context_requested_key != self._file_info_key:
+            self._context_requested_key = self._file_info_key
+            return None
+        self._cached_context_key = self._file_info_key
+        
+        try:
+            from vertexai.preview import caching
+            from vertexai.preview.generative_models import GenerativeModel as PreviewGenerativeModel
+            
+            self._cached_content = caching.CachedContent.create(
+                model_name=self.summary_model_name,
+                system_instruction=SYSTEM_INSTRUCTION,
+                contents=[self._repository_context()],
+                ttl=datetime.timedelta(seconds=CONTEXT_CACHE_TTL_SECONDS),
+            )
+            self._cached_model = PreviewGenerativeModel.from_cached_content(cached_content=self._cached_content)
+            log.info("Created context cache %s", self._cached_content.name)
+        except Exception as e:
+            log.info("Context caching unavailable, sending full prompts: %s", e)
+            self._cached_content = None
+            self._cached_model = None
+        
+        return self._cached_model
+    
+    def _cache_key(self, prompt, model_name):
+        """Key for the prompt disk cache; responses depend on the model as well as the prompt."""
+        return f"{model_name}\n{prompt}"
+    
+    async def _generate_async(self, model, prompt, stop=None):
+        """
+        Async variant of _generate (for the main model), for overlapping several requests.
+        
+        Args:
+            model (GenerativeModel): Instance of the main model created in the running
+                event loop (its async client stays bound to the loop it was first used in)
+            prompt (str): Self-contained prompt
+            stop (callable, optional): Predicate on the text so far; the stream is
+                closed as soon as it returns True
+            
+        Returns:
+            str: The response text
+        """
+        key = self._cache_key(prompt, self.model_name)
+        if self.prompt_cache is not None:
+            text = self.prompt_cache.get(key)
+            if text is not None:
+                return text
+        
+        stream = await model.generate_content_async(prompt, stream=True)
+        text = await _collect_stream_async(stream, stop)
+        
+        if self.prompt_cache is not None:
+            self.prompt_cache.put(key, text)
+        return text
+    
+    def _generate(self, prompt, context_prompt=None, stop=None, summary=False):
+        """
+        Send a prompt to Gemini, using the cached repository context when possible.
+        
+        Responses are streamed, and looked up in (and added to) the prompt disk
+        cache, keyed by the self-contained prompt.
+        
+        Args:
+            prompt (str): Self-contained prompt for the plain model
+            context_prompt (str, optional): Prompt relying on the cached repository context
+                (the context cache belongs to the summary model)
+            stop (callable, optional): Predicate on the text so far; the stream is
+                closed as soon as it returns True
+            summary (bool, optional): Use the cheaper summary model instead of the main one
+            
+        Returns:
+            str: The response text
+        """
+        if summary:
+            model, model_name = self.summary_model, self.summary_model_name
+        else:
+            model, model_name = self.model, self.model_name
+        
+        key = self._cache_key(prompt, model_name)
+        if self.prompt_cache is not None:
+            text = self.prompt_cache.get(key)
+            if text is not None:
+                return text
+        
+        text = None
+        if context_prompt is not None:
+            cached_model = self._get_cached_model()
+            if cached_model is not None:
+                try:
+                    text = _collect_stream(cached_model.generate_content(context_prompt, stream=True), stop)
+                except Exception as e:
+                    # e.g. the cache expired; stop using it for the rest of the run
+                    log.warning("Context cache request failed, sending the full prompt: %s", e)
+                    self._cached_model = None
+        
+        if text is None:
+            text = _collect_stream(model.generate_content(prompt, stream=True), stop)
+        
+        if self.prompt_cache is not None:
+            self.prompt_cache.put(key, text)
+        return text
     
     def prepare_graph_data_for_prompt(self):
         """
@@ -60,6 +776,11 @@ class TerraformCodeModifier:
         Returns:
             str: A text representation of the graph
         """
+        self._get_file_info_map()
+        text = self._graph_text_cache.get('graph')
+        if text is not None:
+            return text
+        
         graph = self.analyzer.dependency_graph
         
         # Get all nodes and edges
@@ -77,7 +798,9 @@ class TerraformCodeModifier:
             module_name = data.get('module_name', '')
             edge_text += f"- {source} -> {target} (module: {module_name})\n"
         
-        return node_text + edge_text
+        text = node_text + edge_text
+        self._graph_text_cache['graph'] = text
+        return text
     
     def identify_relevant_files(self, modification_request):
         """
@@ -90,50 +813,7 @@ class TerraformCodeModifier:
             list: List of file paths that are likely relevant to the request
         """
         try:
-            # Initialize Vertex AI model
-            model = self.GenerativeModel(self.model_name)
-            
-            # Prepare information about all files in the repository
-            file_info = []
-            for node in self.analyzer.dependency_graph.nodes():
-                # Get node data
-                node_data = self.analyzer.dependency_graph.nodes[node]
-                
-                # Get description (use a default if not available)
-                description = node_data.get('description', "Terraform configuration file")
-                
-                # Get dependencies
-                dependencies = []
-                for _, target, data in self.analyzer.dependency_graph.out_edges(node, data=True):
-                    dep_type = data.get('type', 'unknown')
-                    module_name = data.get('module_name', '')
-                    dependencies.append(f"{target} ({dep_type}{': ' + module_name if module_name else ''})")
-                
-                # Add to file info
-                file_info.append({
-                    "file": node,
-                    "description": description,
-                    "dependencies": dependencies
-                })
-            
-            # Create a prompt for the model
-            prompt = f"""
-            You are a Terraform expert. I need to identify which files in a Terraform repository need to be modified to implement the following change:
-            
-            MODIFICATION REQUEST: {modification_request}
-            
-            Here are the files in the repository, with descriptions and dependencies:
-            
-            """
-            
-            # Add file information to the prompt
-            for info in file_info:
-                prompt += f"\nFILE: {info['file']}\n"
-                prompt += f"DESCRIPTION: {info['description']}\n"
-                if info['dependencies']:
-                    prompt += f"DEPENDENCIES: {', '.join(info['dependencies'])}\n"
-            
-            prompt += """
+            instructions = """
             Please identify the files that need to be modified to implement the requested change.
             Return your answer as a JSON array of file paths, like this:
             ["path/to/file1.tf", "path/to/file2.tf"]
@@ -141,22 +821,35 @@ class TerraformCodeModifier:
             Only include files that need to be modified, not files that are just referenced.
             """
             
-            # Generate response
-            response = model.generate_content(prompt)
-            response_text = response.text
+            # The request goes last so the static repository listing forms a
+            # reusable prompt prefix (Gemini implicit caching)
+            request = f"""
+            MODIFICATION REQUEST: {modification_request}
+            """
             
-            # Extract JSON array from response
-            import json
-            import re
+            role = "You are a Terraform expert. I need to identify which files in a Terraform repository need to be modified to implement a change.\n"
             
-            # Look for JSON array in the response
-            json_match = re.search(r'\[.*\]', response_text, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
-                file_paths = json.loads(json_str)
+            candidates = self._seed_candidates(modification_request)
+            if 0 < len(candidates) <= MAX_CANDIDATE_FILES:
+                # Only the graph neighbourhood of matching files goes to Gemini, which filters it
+                log.info("Asking Gemini to choose among %d candidate files", len(candidates))
+                prompt = role + self._repository_context(candidates) + instructions + request
+                response_text = self._generate(prompt, summary=True)
             else:
+                # Create a prompt for the model
+                prompt = role + self._repository_context() + instructions + request
+                
+                # Shorter prompt for when the repository listing is already in the context cache
+                context_prompt = instructions + request
+                
+                # Generate response
+                response_text = self._generate(prompt, context_prompt, summary=True)
+            
+            # Look for JSON array in the response
+            file_paths = _find_json_array(response_text)
+            if file_paths is None:
                 # Fallback: try to extract file paths using regex
-                file_paths = re.findall(r'"([^"]+\.tf)"', response_text)
+                file_paths = _TF_PATH_RE.findall(response_text)
             
             # Validate file paths
             valid_file_paths = []
@@ -169,30 +862,21 @@ class TerraformCodeModifier:
                 if os.path.exists(full_path):
                     valid_file_paths.append(file_path)
                 else:
-                    # Try to find the file by searching the repository
-                    found = False
-                    for root, dirs, files in os.walk(self.analyzer.local_dir):
-                        if os.path.basename(file_path) in files:
-                            # Use the relative path from the repository root
-                            rel_path = os.path.relpath(
-                                os.path.join(root, os.path.basename(file_path)), 
-                                self.analyzer.local_dir
-                            )
-                            valid_file_paths.append(rel_path)
-                            found = True
-                            break
-                    
-                    if not found:
-                        print(f"Warning: File not found: {file_path}")
+                    # Try to find a file with the same name elsewhere in the repository
+                    rel_path = self._find_by_basename(file_path)
+                    if rel_path is not None:
+                        valid_file_paths.append(rel_path)
+                    else:
+                        log.warning("File not found: %s", file_path)
             
-            print(f"Identified {len(valid_file_paths)} valid files:")
+            log.info("Identified %d valid files:", len(valid_file_paths))
             for file in valid_file_paths:
-                print(f"- {file}")
+                log.info("- %s", file)
             
             return valid_file_paths
             
         except Exception as e:
-            print(f"Error identifying relevant files: {str(e)}")
+            log.warning("Error identifying relevant files: %s", e)
             # Fallback: return all .tf files in the repository
             return [node for node in self.analyzer.dependency_graph.nodes()]
     
@@ -211,7 +895,7 @@ class TerraformCodeModifier:
             with open(full_path, 'r') as f:
                 return f.read()
         except Exception as e:
-            print(f"Error reading file {full_path}: {e}")
+            log.warning("Error reading file %s: %s", full_path, e)
             return ""
     
     def modify_files(self, modification_request, file_paths):
@@ -227,73 +911,169 @@ class TerraformCodeModifier:
         """
         modifications = {}
         
-        try:
-            # Initialize Vertex AI model
+        # Invariant part of every per-file prompt; the file-specific delta trails it
+        # so the prefix is reused across the batch (Gemini implicit caching)
+        static_prefix = f"""
+        You are a Terraform expert. I need to modify Terraform files to implement a change.
+        You will be given a file's path, description, dependencies and current content.
+        Please provide the modified version of the file that implements the requested change.
+        Return ONLY the complete modified file content, with no additional explanations.
+        
+        MODIFICATION REQUEST: {modification_request}
+        """
+        
+        file_info = self._get_file_info_map()
+        
+        async def _modify_one(model, file_path):
+            log.info("Generating modifications for %s...", file_path)
+            
+            # Wait for the prefetched original file content
+            original_content = await asyncio.wrap_future(reads[file_path])
+            
+            # Get file description
+            info = file_info.get(file_path)
+            description = info['description'] if info else DEFAULT_DESCRIPTION
+            
+            # Create a prompt for the model
+            prompt = static_prefix + f"""
+            FILE: {file_path}
+            DESCRIPTION: {description}
+            """
+            
+            # Add the file's dependencies and the files around it in the graph
+            prompt += self._context_for(file_path)
+            
+            prompt += f"""
+            Here is the current content of the file:
+            
+            ```terraform
+            {original_content}
+            ```
+            """
+            
+            # Generate response
+            modified_content = await self._generate_async(model, prompt, stop=_code_block_closed)
+            
+            # Extract code block if present
+            code_match = _CODE_BLOCK_RE.search(modified_content)
+            if code_match:
+                modified_content = code_match.group(1)
+            
+            return file_path, modified_content
+        
+        async def _gather():
+            # asyncio.run gives every call a new event loop, and a model's async grpc
+            # channel can only be used from the loop it was created in, so each run
+            # gets its own model instance
             model = self.GenerativeModel(self.model_name)
             
-            # Process each file
-            for file_path in file_paths:
-                print(f"Generating modifications for {file_path}...")
-                
-                # Read the original file content
-                full_path = os.path.join(self.analyzer.local_dir, file_path)
-                with open(full_path, 'r') as f:
-                    original_content = f.read()
-                
-                # Get file description
-                description = "Terraform configuration file"
-                if file_path in self.analyzer.dependency_graph.nodes():
-                    description = self.analyzer.dependency_graph.nodes[file_path].get('description', description)
-                
-                # Get dependencies
-                dependencies = []
-                if file_path in self.analyzer.dependency_graph.nodes():
-                    for _, target, data in self.analyzer.dependency_graph.out_edges(file_path, data=True):
-                        dep_type = data.get('type', 'unknown')
-                        module_name = data.get('module_name', '')
-                        dependencies.append(f"{target} ({dep_type}{': ' + module_name if module_name else ''})")
-                
-                # Create a prompt for the model
-                prompt = f"""
-                You are a Terraform expert. I need to modify a Terraform file to implement the following change:
-                
-                MODIFICATION REQUEST: {modification_request}
-                
-                FILE: {file_path}
-                DESCRIPTION: {description}
-                """
-                
-                if dependencies:
-                    prompt += f"DEPENDENCIES: {', '.join(dependencies)}\n"
-                
-                prompt += f"""
-                Here is the current content of the file:
-                
-                ```terraform
-                {original_content}
-                ```
-                
-                Please provide the modified version of the file that implements the requested change.
-                Return ONLY the complete modified file content, with no additional explanations.
-                """
-                
-                # Generate response
-                response = model.generate_content(prompt)
-                modified_content = response.text
+            # Overlap the requests, with a bound on how many are in flight
+            sem = asyncio.Semaphore(MODIFY_CONCURRENCY)
+            
+            async def _bounded(file_path):
+                async with sem:
+                    return await _modify_one(model, file_path)
+            
+            return await asyncio.gather(*[_bounded(fp) for fp in file_paths], return_exceptions=True)
+        
+        # Prefetch file contents in threads so disk reads overlap the Gemini requests.
+        # The whole file is sent because the response replaces it, so it can't be cut
+        # down like summaries are.
+        with ThreadPoolExecutor(max_workers=READ_WORKERS) as executor:
+            reads = {
+                file_path: executor.submit(
+                    _read_for_prompt, os.path.join(self.analyzer.local_dir, file_path), None
+                )
+                for file_path in file_paths
+            }
+            results = asyncio.run(_gather())
+        
+        for file_path, result in zip(file_paths, results):
+            if isinstance(result, Exception):
+                log.warning("Error generating modifications for %s: %s", file_path, result)
+                continue
+            
+            # Add to modifications
+            _, modified_content = result
+            modifications[file_path] = modified_content
+        
+        return modifications
+    
+    def modify_repo(self, modification_request):
+        """
+        Identify and modify the relevant files with a single Gemini request.
+        
+        Only used for small repositories, where every file fits in one prompt.
+        
+        Args:
+            modification_request (str): Natural language description of the requested change
+            
+        Returns:
+            dict or None: Dictionary mapping file paths to modified content, or None if the
+                repository is too large or the response couldn't be used (run
+                identify_relevant_files and modify_files instead)
+        """
+        file_info = self._get_file_info_map()
+        full_paths = {node: os.path.join(self.analyzer.local_dir, node) for node in file_info}
+        
+        try:
+            total_bytes = sum(os.path.getsize(path) for path in full_paths.values())
+        except OSError as e:
+            log.warning("Error checking repository size: %s", e)
+            return None
+        if not file_info or total_bytes > FUSED_MAX_BYTES:
+            return None
+        
+        try:
+            with ThreadPoolExecutor(max_workers=READ_WORKERS) as executor:
+                contents = dict(zip(full_paths, executor.map(
+                    lambda path: _read_for_prompt(path, max_bytes=None), full_paths.values()
+                )))
+            
+            prompt = "You are a Terraform expert. I need to modify a Terraform repository to implement a change.\n"
+            prompt += self._repository_context()
+            prompt += "\nHere is the current content of every file:\n"
+            for node, content in contents.items():
+                prompt += f"\nFILE: {node}\n```terraform\n{content}\n```\n"
+            prompt += """
+            Please identify the files that need to be modified to implement the requested change
+            and provide the complete modified content of each of them.
+            Return ONLY a JSON object of this form, with no additional explanations:
+            {"files": [{"path": "path/to/file1.tf", "new_content": "complete modified file content"}]}
+            """
+            prompt += f"""
+            MODIFICATION REQUEST: {modification_request}
+            """
+            
+            response_text = self._generate(prompt)
+            result = _find_json_files(response_text)
+            if result is None:
+                log.warning("Could not parse the combined response")
+                return None
+            
+            modifications = {}
+            for item in result['files']:
+                file_path = item['path'].lstrip('/')
+                if file_path not in file_info:
+                    log.warning("Ignoring unknown file: %s", file_path)
+                    continue
                 
                 # Extract code block if present
-                import re
-                code_match = re.search(r'```(?:terraform|hcl)?\s*([\s\S]*?)\s*```', modified_content)
+                modified_content = item['new_content']
+                code_match = _CODE_BLOCK_RE.search(modified_content)
                 if code_match:
                     modified_content = code_match.group(1)
-                
-                # Add to modifications
                 modifications[file_path] = modified_content
+            
+            log.info("Generated modifications for %d files:", len(modifications))
+            for file in modifications:
+                log.info("- %s", file)
+            
+            return modifications
         
         except Exception as e:
-            print(f"Error generating modifications: {str(e)}")
-        
-        return modifications
+            log.warning("Error generating combined modifications: %s", e)
+            return None
     
     def apply_modifications(self, modifications, dry_run=False):
         """
@@ -307,26 +1087,35 @@ class TerraformCodeModifier:
             list: List of modified file paths
         """
         modified_files = []
+        created_dirs = set()
         
         for file_path, content in modifications.items():
             full_path = os.path.join(self.analyzer.local_dir, file_path)
             
-            # Create directory if it doesn't exist
-            os.makedirs(os.path.dirname(full_path), exist_ok=True)
-            
             if dry_run:
-                print(f"Would write to {full_path}:")
-                print("---")
-                print(content)
-                print("---")
+                log.info("Would write to %s", full_path)
+                log.debug("---\n%s\n---", content)
             else:
                 try:
-                    with open(full_path, 'w') as f:
-                        f.write(content)
-                    print(f"Updated {file_path}")
+                    data = content.encode('utf-8')
+                    
+                    # Leave files whose content is unchanged untouched (keeps their mtime)
+                    if _file_has_content(full_path, data):
+                        log.info("Unchanged %s", file_path)
+                        continue
+                    
+                    # Create directory if it doesn't exist
+                    directory = os.path.dirname(full_path)
+                    if directory not in created_dirs:
+                        os.makedirs(directory, exist_ok=True)
+                        created_dirs.add(directory)
+                    
+                    with open(full_path, 'wb') as f:
+                        f.write(data)
+                    log.info("Updated %s", file_path)
                     modified_files.append(file_path)
                 except Exception as e:
-                    print(f"Error writing to {full_path}: {e}")
+                    log.warning("Error writing to %s: %s", full_path, e)
         
         return modified_files
 
@@ -342,18 +1131,20 @@ class TerraformCodeModifier:
             str: Summary of the file
         """
         try:
-            # Initialize Vertex AI model
-            model = self.GenerativeModel(self.model_name)
-            
-            # Read the file content if not provided
+            # Read the file content if not provided, keeping whole blocks if it's too long
             if content is None:
                 full_path = os.path.join(self.analyzer.local_dir, file_path)
-                with open(full_path, 'r') as f:
-                    content = f.read()
+                content = _read_for_prompt(full_path)
+            else:
+                encoded = content.encode('utf-8')
+                if len(encoded) > MAX_PROMPT_BYTES:
+                    content = _trim_to_blocks(encoded, MAX_PROMPT_BYTES)
             
-            # Truncate content if it's too long
-            if len(content) > 10000:
-                content = content[:10000] + "... (truncated)"
+            # Reuse the summary of identical content from this or an earlier run of the same model
+            digest = hashlib.sha256(f"{self.summary_model_name}\n{content}".encode('utf-8')).hexdigest()
+            summary_cache = self._get_summary_cache()
+            if digest in summary_cache:
+                return summary_cache[digest]
             
             # Create a prompt for the model
             prompt = f"""
@@ -370,13 +1161,50 @@ class TerraformCodeModifier:
             """
             
             # Generate response
-            response = model.generate_content(prompt)
-            summary = response.text.strip()
+            summary = self._generate(prompt, summary=True).strip()
             
+            summary_cache[digest] = summary
+            self._summary_cache_dirty = True
             return summary
         except Exception as e:
-            print(f"Error generating summary for {file_path}: {str(e)}")
+            log.warning("Error generating summary for %s: %s", file_path, e)
             return f"Terraform file: {file_path}"
+    
+    def _get_summary_cache(self):
+        """
+        Get the summary cache, loading it from disk on first use.
+        
+        Callers save it with save_summary_cache after each batch of summaries; it is
+        also written back when the process exits.
+        
+        Returns:
+            dict: Mapping of SHA-256 of summary model and file content to summary
+        """
+        if self._summary_cache is None:
+            try:
+                with open(self._summary_cache_path, 'r') as f:
+                    self._summary_cache = json.load(f)
+            except FileNotFoundError:
+                self._summary_cache = {}
+            except Exception as e:
+                log.warning("Ignoring unreadable summary cache %s: %s", self._summary_cache_path, e)
+                self._summary_cache = {}
+            atexit.register(self.save_summary_cache)
+        return self._summary_cache
+    
+    def save_summary_cache(self):
+        """Write the summary cache atomically, if it has new entries."""
+        if not self._summary_cache_dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self._summary_cache_path), exist_ok=True)
+            tmp_path = self._summary_cache_path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self._summary_cache, f)
+            os.replace(tmp_path, self._summary_cache_path)
+            self._summary_cache_dirty = False
+        except Exception as e:
+            log.warning("Error writing summary cache %s: %s", self._summary_cache_path, e)
 
 
 def main():
@@ -386,12 +1214,18 @@ def main():
     parser.add_argument("request", help="Natural language description of the requested change")
     parser.add_argument("--branch", default="master", help="Branch to clone (default: master)")
     parser.add_argument("--output-dir", default="./terraform_analysis", help="Directory to store analysis results")
-    parser.add_argument("--dry-run", action="store_true", help="Don't actually write the files")
+    parser.add_argument("--dry-run", action="store_true", help="Don't actually write the files (use --verbose to print the new content)")
     parser.add_argument("--credentials", help="Path to Google Cloud credentials JSON file")
-    parser.add_argument("--model", default=MODEL_NAME, help=f"Gemini model name (default: {MODEL_NAME})")
+    parser.add_argument("--model", default=default_model_name(), help=f"Gemini model name (default: {default_model_name()})")
+    parser.add_argument("--summary-model", default=default_summary_model_name(),
+                        help=f"Gemini model for identifying and summarizing files (default: {default_summary_model_name()})")
+    parser.add_argument("--verbose", action="store_true", help="Enable verbose output")
+    parser.add_argument("--no-cache", action="store_true", help="Don't reuse cached Gemini responses")
     
     args = parser.parse_args()
     
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(message)s")
+    
     # Create output directory if it doesn't exist
     os.makedirs(args.output_dir, exist_ok=True)
     
@@ -400,24 +1234,47 @@ def main():
     
     # Run analysis first
     print("Step 1: Analyzing repository...")
-    analyzer = TerraformRepoAnalyzer(args.repo_url, args.branch, local_dir)
+    analyzer = TerraformRepoAnalyzer(args.repo_url, args.branch, local_dir, cache_dir=args.output_dir)
     analyzer.analyze_repository()
     
     # Initialize modifier
     print("\nStep 2: Processing modification request...")
-    modifier = TerraformCodeModifier(analyzer, credentials_path=args.credentials, model_name=args.model)
-    
-    # Identify relevant files
-    print("\nIdentifying relevant files...")
-    relevant_files = modifier.identify_relevant_files(args.request)
+    modifier = TerraformCodeModifier(
+        analyzer, credentials_path=args.credentials, model_name=args.model, use_cache=not args.no_cache,
+        summary_model_name=args.summary_model,
+    )
+    try:
+        run_modification(modifier, args)
+    finally:
+        modifier.close()
+
+
+def run_modification(modifier, args):
+    """Identify, generate and apply the requested modification."""
     
-    if not relevant_files:
-        print("No relevant files identified. Cannot proceed with modification.")
-        return
+    # Small repositories are identified and modified in one request
+    modifications = modifier.modify_repo(args.request)
     
-    # Generate modifications
-    print("\nGenerating modifications...")
-    modifications = modifier.modify_files(args.request, relevant_files)
+    if modifications is None:
+        # Small repositories don't need Gemini to pick files
+        analyzer = modifier.analyzer
+        relevant_files = _shortcut_relevant_files(
+            args.request, analyzer.local_dir, list(analyzer.dependency_graph.nodes())
+        )
+        if relevant_files:
+            print(f"\nSelected {len(relevant_files)} files by searching the repository")
+        else:
+            # Identify relevant files
+            print("\nIdentifying relevant files...")
+            relevant_files = modifier.identify_relevant_files(args.request)
+        
+        if not relevant_files:
+            print("No relevant files identified. Cannot proceed with modification.")
+            return
+        
+        # Generate modifications
+        print("\nGenerating modifications...")
+        modifications = modifier.modify_files(args.request, relevant_files)
     
     if not modifications:
         print("No modifications generated. No files will be changed.")
@@ -8,32 +8,57 @@ natural language requests, using the TerraformRepoAnalyzer and TerraformCodeModi
 
 import os
 import sys
+import mmap
+import atexit
+import shutil
+import itertools
+from collections import deque
 import re
 import streamlit as st
 import tempfile
 from pathlib import Path
 import networkx as nx
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import io
-import base64
 from matplotlib.colors import LinearSegmentedColormap
+from matplotlib.lines import Line2D
 import numpy as np
+import pandas as pd
 from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
 
+# Plotly is optional: imported once here, with the interactive view disabled
+# when it's missing
+try:
+    import plotly.graph_objects as go
+    import plotly.io as pio
+except ImportError:
+    go = None
+
+# Serialize Plotly figures with orjson instead of the stdlib json encoder, when
+# it's installed (Plotly raises ValueError for an unavailable engine)
+if go is not None:
+    try:
+        pio.json.config.default_engine = 'orjson'
+    except (ImportError, ValueError):
+        pass
+
 # Import the analyzer and modifier
 from terraform_analyzer import TerraformRepoAnalyzer
 from terraform_modifier import TerraformCodeModifier
 
 # Import constants
 from constants import (
-    PROJECT_ID, LOCATION, MODEL_NAME, GENERATION_CONFIG,
+    GENERATION_CONFIG,
     DEFAULT_OUTPUT_DIR, DEFAULT_LOCAL_DIR, DEFAULT_BRANCH,
     PAGE_TITLE, PAGE_ICON, PAGE_LAYOUT, SIDEBAR_STATE,
     CUSTOM_CSS, REQUIRED_DEPENDENCIES, INSTALL_INSTRUCTIONS,
     EXAMPLE_REPOS, VIZ_COLORS
 )
 
+# Colormap for the static graph's node types, built once per process
+_TERRAFORM_CMAP = LinearSegmentedColormap.from_list("terraform_cmap", VIZ_COLORS, N=100)
+
 # Set page configuration
 st.set_page_config(
     page_title=PAGE_TITLE,
@@ -45,14 +70,88 @@ st.set_page_config(
 # Add custom CSS
 st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
+def _scan_files(root):
+    """
+    Yield every file under a directory, breadth-first.
+    
+    Uses os.scandir, whose directory entries already know their type, so no
+    stat call is needed per file; shallower files come first, as with os.walk.
+    
+    Args:
+        root (str): Directory to scan
+        
+    Yields:
+        os.DirEntry: Entry for each file
+    """
+    queue = deque([root])
+    while queue:
+        directory = queue.popleft()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        queue.append(entry.path)
+                    else:
+                        yield entry
+        except OSError:
+            continue
+
+@st.cache_resource
+def _build_file_index(local_dir):
+    """
+    Index every file in a repository by file name.
+    
+    Args:
+        local_dir (str): Repository root
+        
+    Returns:
+        dict: Mapping of file name to the full paths of files with that name
+    """
+    index = {}
+    for entry in _scan_files(local_dir):
+        index.setdefault(entry.name, []).append(entry.path)
+    return index
+
+# Files above this size are shown truncated
+MAX_DISPLAY_BYTES = 262144
+
+# Files above this size are memory-mapped instead of read
+MMAP_MIN_BYTES = 1048576
+
+def _read_capped(full_path, max_bytes):
+    """
+    Read at most max_bytes of a file, noting when it was truncated.
+    
+    Args:
+        full_path (str): Path to the file
+        max_bytes (int): Maximum number of bytes to read
+        
+    Returns:
+        str: Content of the file
+    """
+    with open(full_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size > MMAP_MIN_BYTES:
+            # Slice the mapping so only the shown part is copied
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                raw = mm[:max_bytes]
+        else:
+            raw = f.read(max_bytes)
+    
+    text = raw.decode('utf-8', 'replace')
+    if size > max_bytes:
+        text += f"\n\n... (truncated: showing {max_bytes} of {size} bytes)"
+    return text
+
 # Define the read_file_content function first
-def read_file_content(analyzer, file_path):
+def read_file_content(analyzer, file_path, max_bytes=MAX_DISPLAY_BYTES):
     """
     Read the content of a file.
     
     Args:
         analyzer: The TerraformRepoAnalyzer instance
         file_path (str): Path to the file (relative to repository root)
+        max_bytes (int, optional): Maximum number of bytes to read
         
     Returns:
         str: Content of the file
@@ -68,34 +167,34 @@ def read_file_content(analyzer, file_path):
     try:
         # Check if the file exists
         if not os.path.exists(full_path):
-            # Try to find the file by searching the repository
-            possible_matches = []
-            for root, dirs, files in os.walk(analyzer.local_dir):
-                for file in files:
-                    if file == os.path.basename(file_path):
-                        possible_matches.append(os.path.join(root, file))
+            # Try to find the file by name elsewhere in the repository
+            possible_matches = _build_file_index(analyzer.local_dir).get(os.path.basename(file_path), [])
             
             if possible_matches:
                 # Use the first match
                 full_path = possible_matches[0]
-                return f"File found at alternative location: {os.path.relpath(full_path, analyzer.local_dir)}\n\n" + open(full_path, 'r').read()
+                return f"File found at alternative location: {os.path.relpath(full_path, analyzer.local_dir)}\n\n" + _read_capped(full_path, max_bytes)
             else:
                 return f"Error: File not found: {file_path}"
         
-        with open(full_path, 'r') as f:
-            return f.read()
+        return _read_capped(full_path, max_bytes)
     except Exception as e:
         # Try to find similar files as a fallback
         try:
             base_name = os.path.basename(file_path)
-            similar_files = []
-            for root, dirs, files in os.walk(analyzer.local_dir):
-                for file in files:
-                    if file.endswith('.tf') and (base_name in file or file in base_name):
-                        similar_files.append(os.path.join(root, file))
+            # Stop at the first five matches
+            similar_files = list(itertools.islice(
+                (
+                    path
+                    for file, paths in _build_file_index(analyzer.local_dir).items()
+                    if file.endswith('.tf') and (base_name in file or file in base_name)
+                    for path in paths
+                ),
+                5
+            ))
             
             if similar_files:
-                similar_files_text = "\n".join([f"- {os.path.relpath(f, analyzer.local_dir)}" for f in similar_files[:5]])
+                similar_files_text = "\n".join([f"- {os.path.relpath(f, analyzer.local_dir)}" for f in similar_files])
                 return f"Error reading file: {str(e)}\n\nSimilar files found:\n{similar_files_text}"
         except:
             pass
@@ -122,6 +221,10 @@ def check_dependencies():
 # Call the dependency check at the start
 check_dependencies()
 
+# GitHub web UI path segments (/tree/{branch}, /blob/{branch}) stripped from repository URLs
+_BRANCH_PATH_TAIL_RE = re.compile(r'/(?:tree|blob)/[^/]+/?$')
+_BRANCH_PATH_RE = re.compile(r'/(?:tree|blob)/[^/]+/')
+
 def clean_github_url(url):
     """
     Clean a GitHub URL to make it suitable for cloning.
@@ -132,13 +235,9 @@ def clean_github_url(url):
     Returns:
         str: Clean URL suitable for git clone
     """
-    # Remove /tree/{branch} from GitHub URLs
-    url = re.sub(r'/tree/[^/]+/?$', '', url)
-    url = re.sub(r'/tree/[^/]+/', '/', url)
-    
-    # Remove /blob/{branch} from GitHub URLs
-    url = re.sub(r'/blob/[^/]+/?$', '', url)
-    url = re.sub(r'/blob/[^/]+/', '/', url)
+    # Remove /tree/{branch} and /blob/{branch} from GitHub URLs
+    url = _BRANCH_PATH_TAIL_RE.sub('', url)
+    url = _BRANCH_PATH_RE.sub('/', url)
     
     # Ensure the URL doesn't end with .git if it's a GitHub URL (GitHub adds this automatically)
     if 'github.com' in url and url.endswith('.git'):
@@ -149,6 +248,47 @@ def clean_github_url(url):
     
     return url
 
+# Fixed width/height attributes on matplotlib's root <svg> element
+_SVG_SIZE_RE = re.compile(r'\s(?:width|height)="[^"]*"')
+
+# Graphs with more nodes than this are laid out with spectral_layout instead of spring_layout
+SPECTRAL_LAYOUT_MIN_NODES = 500
+
+@st.cache_data(max_entries=8)
+def _layout(nodes, edges):
+    """
+    Compute node positions for a graph, cached across reruns.
+    
+    Args:
+        nodes (tuple): Sorted node names
+        edges (tuple): Sorted (source, target) pairs
+        
+    Returns:
+        dict: Mapping of node to its (x, y) position
+    """
+    layout_graph = nx.DiGraph()
+    layout_graph.add_nodes_from(nodes)
+    layout_graph.add_edges_from(edges)
+    
+    # Large graphs use the (sparse eigensolver) spectral layout; smaller ones get
+    # fewer spring-layout iterations as they grow
+    n = len(nodes)
+    if n > SPECTRAL_LAYOUT_MIN_NODES:
+        return nx.spectral_layout(layout_graph)
+    return nx.spring_layout(layout_graph, seed=42, iterations=max(10, min(50, 2000 // max(1, n))))
+
+def graph_layout(graph):
+    """
+    Get node positions for a graph, reusing the cached layout when the graph is unchanged.
+    
+    Args:
+        graph (nx.DiGraph): The dependency graph
+        
+    Returns:
+        dict: Mapping of node to its (x, y) position
+    """
+    return _layout(tuple(sorted(graph.nodes())), tuple(sorted(graph.edges())))
+
 def visualize_dependency_graph(graph):
     """
     Create a visualization of the dependency graph.
@@ -157,34 +297,36 @@ def visualize_dependency_graph(graph):
         graph (nx.DiGraph): The dependency graph
         
     Returns:
-        str: Base64 encoded PNG image of the graph
+        str: SVG image of the graph
     """
-    plt.figure(figsize=(12, 8))
+    # An explicit Figure (no pyplot global state); constrained layout replaces tight_layout
+    fig = Figure(figsize=(12, 8), layout='constrained')
+    ax = fig.add_subplot(111)
     
-    # Create a custom colormap for nodes
-    cmap = LinearSegmentedColormap.from_list("terraform_cmap", VIZ_COLORS, N=100)
+    # Custom colormap for nodes
+    cmap = _TERRAFORM_CMAP
     
     # Use a spring layout for the graph
-    pos = nx.spring_layout(graph, seed=42)
-    
-    # Get node types for coloring
-    node_types = {}
-    for node, data in graph.nodes(data=True):
-        node_type = data.get('type', 'unknown')
-        if node_type not in node_types:
-            node_types[node_type] = []
-        node_types[node_type].append(node)
-    
-    # Draw nodes by type with different colors
-    for i, (node_type, nodes) in enumerate(node_types.items()):
-        nx.draw_networkx_nodes(
-            graph, pos, 
-            nodelist=nodes,
-            node_color=[cmap(i/max(1, len(node_types)-1))],
-            node_size=300,
-            alpha=0.8,
-            label=node_type
-        )
+    pos = graph_layout(graph)
+    
+    # Get node types for coloring: an integer code per node
+    nodelist = list(graph.nodes())
+    node_types = [graph.nodes[node].get('type', 'unknown') for node in nodelist]
+    type_index = {node_type: i for i, node_type in enumerate(sorted(set(node_types)))}
+    colors = np.fromiter((type_index[node_type] for node_type in node_types), dtype=np.int32, count=len(nodelist))
+    
+    # Draw all nodes at once, letting matplotlib map the codes through the colormap
+    nx.draw_networkx_nodes(
+        graph, pos,
+        nodelist=nodelist,
+        node_color=colors,
+        cmap=cmap,
+        vmin=0,
+        vmax=max(1, len(type_index)-1),
+        node_size=300,
+        alpha=0.8,
+        ax=ax
+    )
     
     # Draw edges with arrows
     nx.draw_networkx_edges(
@@ -192,31 +334,43 @@ def visualize_dependency_graph(graph):
         width=1.0,
         alpha=0.5,
         arrowsize=15,
-        arrowstyle='->'
+        arrowstyle='->',
+        ax=ax
     )
     
     # Draw labels with smaller font
     nx.draw_networkx_labels(
         graph, pos,
         font_size=8,
-        font_family='sans-serif'
+        font_family='sans-serif',
+        ax=ax
     )
     
-    plt.title("Terraform Module Dependencies")
-    plt.axis('off')
-    plt.tight_layout()
-    plt.legend()
-    
-    # Save the figure to a bytes buffer
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=150)
-    plt.close()
-    
-    # Encode the image to base64
-    buf.seek(0)
-    img_str = base64.b64encode(buf.read()).decode('utf-8')
-    
-    return img_str
+    ax.set_title("Terraform Module Dependencies")
+    ax.axis('off')
+    
+    # One legend entry per node type
+    ax.legend(handles=[
+        Line2D([0], [0], marker='o', linestyle='', color=cmap(i/max(1, len(type_index)-1)), label=node_type)
+        for node_type, i in type_index.items()
+    ])
+    
+    # Save the figure as SVG: smaller than a raster for line-and-text drawings,
+    # and sharp at any display resolution
+    buf = io.StringIO()
+    fig.savefig(buf, format='svg')
+    
+    # Drop the XML prolog so the markup can be embedded in the page, and swap the
+    # fixed point size for the column width (the viewBox keeps the aspect ratio)
+    svg = buf.getvalue()
+    svg = svg[svg.find('<svg'):]
+    root_end = svg.find('>')
+    return _SVG_SIZE_RE.sub('', svg[:root_end]) + ' style="width:100%;height:auto"' + svg[root_end:]
+
+# Larger graphs are cut down to this many nodes and edges for the interactive view,
+# bounding the hover-text payload sent to the browser
+MAX_PLOTLY_NODES = 2000
+MAX_PLOTLY_EDGES = 5000
 
 def create_plotly_graph(graph):
     """
@@ -226,61 +380,62 @@ def create_plotly_graph(graph):
         graph (nx.DiGraph): The dependency graph
         
     Returns:
-        plotly.graph_objects.Figure: Plotly figure
+        plotly.graph_objects.Figure: Plotly figure, or None if Plotly isn't installed
     """
+    if go is None:
+        return None
+    
     try:
-        import plotly.graph_objects as go
+        # Only draw the first nodes and edges of very large graphs
+        if graph.number_of_nodes() > MAX_PLOTLY_NODES:
+            graph = graph.subgraph(itertools.islice(graph.nodes(), MAX_PLOTLY_NODES))
+            st.warning(f"Graph truncated to {MAX_PLOTLY_NODES} nodes for rendering")
+        if graph.number_of_edges() > MAX_PLOTLY_EDGES:
+            # Hide the extra edges only, so every kept node is still drawn
+            kept_edges = set(itertools.islice(graph.edges(), MAX_PLOTLY_EDGES))
+            graph = nx.subgraph_view(graph, filter_edge=lambda source, target: (source, target) in kept_edges)
+            st.warning(f"Graph truncated to {MAX_PLOTLY_EDGES} edges for rendering")
         
         # Use a spring layout for the graph
-        pos = nx.spring_layout(graph, seed=42)
+        pos = graph_layout(graph)
         
-        # Create edge traces
-        edge_x = []
-        edge_y = []
-        edge_text = []
+        # Node coordinates as one (N, 2) float32 array, which Plotly sends as
+        # base64-encoded typed arrays instead of one JSON number per point
+        nodes = list(graph.nodes())
+        node_index = {node: i for i, node in enumerate(nodes)}
+        xy = np.array([pos[node] for node in nodes], dtype=np.float32).reshape(len(nodes), 2)
+        node_x, node_y = xy[:, 0], xy[:, 1]
         
-        for edge in graph.edges(data=True):
-            x0, y0 = pos[edge[0]]
-            x1, y1 = pos[edge[1]]
-            edge_x.extend([x0, x1, None])
-            edge_y.extend([y0, y1, None])
-            
-            # Add edge information
-            edge_type = edge[2].get('type', 'unknown')
-            module_name = edge[2].get('module_name', '')
-            edge_text.append(f"Type: {edge_type}<br>Module: {module_name}")
+        # Create edge traces: (source, target, NaN) triplets so each edge is a separate segment,
+        # gathered from the node coordinates by index instead of edge by edge
+        edges = list(graph.edges(data=True))
+        src = np.fromiter((node_index[source] for source, _, _ in edges), dtype=np.int64, count=len(edges))
+        dst = np.fromiter((node_index[target] for _, target, _ in edges), dtype=np.int64, count=len(edges))
+        edge_xy = np.full((3 * len(edges), 2), np.nan, dtype=np.float32)
+        edge_xy[0::3] = xy[src]
+        edge_xy[1::3] = xy[dst]
         
+        # Add edge information; the few distinct types and module names are interned
+        edge_types = [sys.intern(data.get('type', 'unknown')) for _, _, data in edges]
+        module_names = [sys.intern(data.get('module_name', '')) for _, _, data in edges]
+        edge_text = [f"Type: {t}<br>Module: {m}" for t, m in zip(edge_types, module_names)]
+        
+        # Traces and layout are built from known-good literals, so skip Plotly's
+        # per-property validation, which is costly on long hover-text lists
         edge_trace = go.Scatter(
-            x=edge_x, y=edge_y,
+            x=edge_xy[:, 0], y=edge_xy[:, 1],
             line=dict(width=0.5, color='#888'),
             hoverinfo='text',
             text=edge_text,
-            mode='lines')
+            mode='lines',
+            _validate=False)
         
         # Create node traces
-        node_x = []
-        node_y = []
-        node_text = []
-        node_color = []
+        node_types = [data.get('type', 'unknown') for _, data in graph.nodes(data=True)]
+        node_text = [f"{node}<br>Type: {node_type}" for node, node_type in zip(nodes, node_types)]
         
-        # Get node types for coloring
-        node_types = {}
-        for node, data in graph.nodes(data=True):
-            node_type = data.get('type', 'unknown')
-            if node_type not in node_types:
-                node_types[node_type] = len(node_types)
-        
-        for node, data in graph.nodes(data=True):
-            x, y = pos[node]
-            node_x.append(x)
-            node_y.append(y)
-            
-            # Add node information
-            node_type = data.get('type', 'unknown')
-            node_text.append(f"{node}<br>Type: {node_type}")
-            
-            # Color by node type
-            node_color.append(node_types.get(node_type, 0))
+        # Color by node type: integer code of each node's type
+        _, node_color = np.unique(np.array(node_types, dtype=object), return_inverse=True)
         
         node_trace = go.Scatter(
             x=node_x, y=node_y,
@@ -297,7 +452,9 @@ def create_plotly_graph(graph):
                     title='Node Type',
                     xanchor='left',
                 ),
-                line_width=2))
+                # Nested form: magic underscores are only expanded when validating
+                line=dict(width=2)),
+            _validate=False)
         
         # Create the figure with corrected layout properties
         fig = go.Figure(data=[edge_trace, node_trace],
@@ -310,14 +467,56 @@ def create_plotly_graph(graph):
                           hovermode='closest',
                           margin=dict(b=20,l=5,r=5,t=40),
                           xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
-                          yaxis=dict(showgrid=False, zeroline=False, showticklabels=False))
-                          )
+                          yaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+                          _validate=False),
+                      skip_invalid=True,
+                      _validate=False)
         
         return fig
     except Exception as e:
         st.error(f"Error creating Plotly graph: {str(e)}")
         return None
 
+@st.cache_resource(show_spinner=False)
+def get_analyzer(repo_url, branch):
+    """
+    Clone a repository and build its dependency graph, once per URL and branch.
+    
+    Args:
+        repo_url (str): URL of the repository
+        branch (str): Branch to analyze
+        
+    Returns:
+        TerraformRepoAnalyzer: Analyzer with the dependency graph built
+    """
+    # One private (0700, unguessable) working directory per URL and branch, made
+    # once per process since this function is cached, and removed at exit
+    work_dir = tempfile.mkdtemp(prefix="tfmod_")
+    atexit.register(shutil.rmtree, work_dir, ignore_errors=True)
+    
+    analyzer = TerraformRepoAnalyzer(repo_url, branch, os.path.join(work_dir, "repo"), cache_dir=work_dir)
+    analyzer.clone_repository()
+    analyzer.build_dependency_graph()
+    return analyzer
+
+@st.cache_resource(show_spinner=False)
+def get_modifier(_analyzer, analyzer_key, model_name):
+    """
+    Get the code modifier for an analyzer and model, creating it only once.
+    
+    Args:
+        _analyzer (TerraformRepoAnalyzer): Analyzer to use (not hashed by Streamlit)
+        analyzer_key (str): Identifies the analyzer in the cache (its local_dir)
+        model_name (str): Gemini model to use
+        
+    Returns:
+        TerraformCodeModifier: The modifier
+    """
+    modifier = TerraformCodeModifier(_analyzer, model_name=model_name)
+    # Cached modifiers live as long as the server; delete their Vertex AI context cache at exit
+    atexit.register(modifier.close)
+    return modifier
+
 # Initialize session state variables
 if 'analyzer' not in st.session_state:
     st.session_state.analyzer = None
@@ -395,15 +594,9 @@ if analyze_button and repo_url:
                 st.info(f"Cleaned repository URL: {cleaned_repo_url}")
                 repo_url = cleaned_repo_url
             
-            # Create a temporary directory for the repository
-            temp_dir = tempfile.mkdtemp()
-            
-            # Initialize and run the analyzer
-            analyzer = TerraformRepoAnalyzer(repo_url, branch, temp_dir)
-            
-            # Try to clone the repository
+            # Clone and analyze the repository (reused if this URL and branch were already analyzed)
             try:
-                analyzer.clone_repository()
+                analyzer = get_analyzer(repo_url, branch)
             except Exception as clone_error:
                 st.error(f"Error cloning repository: {str(clone_error)}")
                 
@@ -422,9 +615,8 @@ if analyze_button and repo_url:
                 
                 st.stop()
             
-            # Check if any files were found
-            tf_files = analyzer.find_terraform_files()
-            if len(tf_files) == 0:
+            # Check if any files were found (every Terraform file is a graph node)
+            if analyzer.dependency_graph.number_of_nodes() == 0:
                 st.error(f"No Terraform files found in the repository. Please check the URL and branch.")
                 st.session_state.repo_analyzed = False
                 
@@ -436,7 +628,7 @@ if analyze_button and repo_url:
                 
                 if uploaded_files:
                     # Create a directory for the uploaded files
-                    upload_dir = os.path.join(temp_dir, "uploaded_files")
+                    upload_dir = os.path.join(tempfile.mkdtemp(), "uploaded_files")
                     os.makedirs(upload_dir, exist_ok=True)
                     
                     # Save the uploaded files
@@ -461,14 +653,6 @@ if analyze_button and repo_url:
                 
                 st.stop()
             
-            analyzer.build_dependency_graph()
-            
-            # Verify the graph has nodes
-            if analyzer.dependency_graph.number_of_nodes() == 0:
-                st.error("No files were added to the dependency graph. Please check if the repository contains valid Terraform files.")
-                st.session_state.repo_analyzed = False
-                st.stop()
-            
             # Generate file summaries and vectorize them
             with st.status("Generating file summaries and embeddings..."):
                 # Initialize the embedding model
@@ -477,6 +661,7 @@ if analyze_button and repo_url:
                 
                 # Generate summaries for each file
                 file_summaries = {}
+                modifier = None
                 for file_path in analyzer.dependency_graph.nodes():
                     # Check if we already have a description from the analyzer
                     description = analyzer.dependency_graph.nodes[file_path].get('description')
@@ -490,7 +675,7 @@ if analyze_button and repo_url:
                                 description = f"Terraform file: {file_path}"
                             else:
                                 try:
-                                    modifier = TerraformCodeModifier(analyzer, model_name=model_name)
+                                    modifier = get_modifier(analyzer, analyzer.local_dir, model_name)
                                     description = modifier.generate_file_summary(file_path, content)
                                 except Exception as e:
                                     st.warning(f"Error generating summary for {file_path}: {str(e)}")
@@ -501,6 +686,10 @@ if analyze_button and repo_url:
                     file_summaries[file_path] = description
                     st.write(f"Processed: {file_path}")
                 
+                # Persist the new summaries now rather than when the server exits
+                if modifier is not None:
+                    modifier.save_summary_cache()
+                
                 # Vectorize the summaries
                 file_vectors = {}
                 for file_path, summary in file_summaries.items():
@@ -546,7 +735,9 @@ if st.session_state.repo_analyzed:
                 description = analyzer.dependency_graph.nodes[file].get('description', "No description available")
                 with st.expander(file):
                     st.write(f"**Description:** {description}")
-                    st.code(read_file_content(analyzer, file), language="hcl")
+                    # Only read the file once the user asks for it
+                    if st.checkbox("Show content", key=f"open_{file}"):
+                        st.code(read_file_content(analyzer, file), language="hcl")
             if len(files) > 20:
                 st.write(f"... and {len(files) - 20} more files")
         else:
@@ -558,18 +749,21 @@ if st.session_state.repo_analyzed:
         if dependencies:
             st.subheader(f"Module Dependencies ({len(dependencies)})")
             
-            # Create a table of dependencies
-            dependency_data = []
-            for source, target, data in dependencies:
-                dependency_data.append({
-                    "Source": source,
-                    "Target": target,
-                    "Type": data.get('type', 'unknown'),
-                    "Module Name": data.get('module_name', '')
-                })
+            # Create a table of dependencies, one column at a time
+            sources, targets, types, module_names = zip(*(
+                (source, target, data.get('type', 'unknown'), data.get('module_name', ''))
+                for source, target, data in dependencies
+            ))
+            dependency_data = pd.DataFrame({
+                "Source": pd.array(sources, dtype="string"),
+                "Target": pd.array(targets, dtype="string"),
+                # Few distinct types: dictionary-encoded in the Arrow payload
+                "Type": pd.Categorical(types),
+                "Module Name": pd.array(module_names, dtype="string"),
+            })
             
             # Display as a dataframe
-            st.dataframe(dependency_data)
+            st.dataframe(dependency_data, use_container_width=True)
         else:
             st.warning("No dependencies found in the repository.")
     
@@ -587,8 +781,8 @@ if st.session_state.repo_analyzed:
             
             if viz_type == "Static Image":
                 # Generate and display the static image
-                img_str = visualize_dependency_graph(analyzer.dependency_graph)
-                st.image(f"data:image/png;base64,{img_str}", use_column_width=True)
+                svg = visualize_dependency_graph(analyzer.dependency_graph)
+                st.markdown(f'<div style="width: 100%">{svg}</div>', unsafe_allow_html=True)
             else:
                 # Try to generate the interactive graph
                 fig = create_plotly_graph(analyzer.dependency_graph)
@@ -596,8 +790,8 @@ if st.session_state.repo_analyzed:
                     st.plotly_chart(fig, use_container_width=True)
                 else:
                     # Fall back to static image
-                    img_str = visualize_dependency_graph(analyzer.dependency_graph)
-                    st.image(f"data:image/png;base64,{img_str}", use_column_width=True)
+                    svg = visualize_dependency_graph(analyzer.dependency_graph)
+                    st.markdown(f'<div style="width: 100%">{svg}</div>', unsafe_allow_html=True)
         else:
             st.warning("No nodes in the dependency graph to visualize.")
     
@@ -623,8 +817,8 @@ if st.session_state.repo_analyzed:
         else:
             with st.spinner("Identifying relevant files..."):
                 try:
-                    # Initialize the modifier
-                    modifier = TerraformCodeModifier(analyzer, model_name=model_name)
+                    # Get the modifier (created once per repository and model)
+                    modifier = get_modifier(analyzer, analyzer.local_dir, model_name)
                     
                     # Use vector similarity to find relevant files
                     if st.session_state.embedding_model is not None and st.session_state.file_vectors:
@@ -701,8 +895,8 @@ if st.session_state.repo_analyzed:
         else:
             with st.spinner("Generating modifications..."):
                 try:
-                    # Initialize the modifier
-                    modifier = TerraformCodeModifier(analyzer, model_name=model_name)
+                    # Get the modifier (created once per repository and model)
+                    modifier = get_modifier(analyzer, analyzer.local_dir, model_name)
                     
                     # Generate modifications
                     modifications = modifier.modify_files(modification_request, st.session_state.relevant_files)
@@ -735,8 +929,8 @@ if st.session_state.repo_analyzed:
         if apply_button:
             with st.spinner("Applying modifications..."):
                 try:
-                    # Initialize the modifier
-                    modifier = TerraformCodeModifier(analyzer, model_name=model_name)
+                    # Get the modifier (created once per repository and model)
+                    modifier = get_modifier(analyzer, analyzer.local_dir, model_name)
                     
                     # Apply modifications
                     modified_files = modifier.apply_modifications(st.session_state.modifications)